@@ -1,18 +1,27 @@
 import tkinter as tk
 from PIL import Image, ImageTk
+from collections import OrderedDict
+import itertools
 import random
+import math
+import time
 import os
 
 # ---------------- GLOBAL VARIABLES ----------------
+window = None               # Main Tk window, created when the quiz starts
 level = ""                  # Difficulty level selected (Easy, Moderate, Advanced)
 score = 0                   # Total score accumulated
 correct_answers = 0         # Number of correctly answered questions
 wrong_answers = 0           # Number of wrong answers or timed out questions
 current_question = 1        # Tracks which question number user is on (1 to 10)
-time_left = 20              # Countdown timer for each question
+QUESTION_SECONDS = 20       # Time allowed for each question
+time_left = QUESTION_SECONDS  # Whole seconds left on the current question (as shown)
+question_deadline = 0.0     # time.monotonic() at which the current question times out
 attempt = 1                 # Tracks first or second attempt per question
 bg_label = None             # Holds background image label
-timer_id = None             # Holds timer callback ID to cancel countdown safely
+timer_task = None           # Scheduler task updating the countdown, None when stopped
+next_task = None            # Scheduler task moving on to the next question, None if not queued
+question_label = None       # Question screen widgets, built once per quiz by build_quiz_screen()
 
 # ---------------- RESOURCE HANDLING ----------------
 def resource_path(filename):
@@ -27,16 +36,88 @@ def resource_path(filename):
 START_BG = resource_path("background.jpg")
 MAIN_BG = resource_path("main_bg.jpg")
 
+# Background cache: screen-sized PhotoImages in memory, plus pre-resized copies on disk
+BG_CACHE_DIR = resource_path(".bg_cache")  # Pre-resized backgrounds, reused across runs
+BG_CACHE_SIZE = 4                          # Ready-to-use PhotoImages kept in memory
+bg_photos = OrderedDict()                  # (image path, (width, height)) -> PhotoImage, least recent first
+
 # ---------------- WINDOW UTILITIES ----------------
 def clear_window():
     """
     Clear all widgets from the window except the background image.
     This prevents overlapping widgets when switching pages.
+    Animations and timers started by the old page are cancelled too.
     """
+    cancel_page_tasks()
     for widget in window.winfo_children():
         if widget != bg_label:
             widget.destroy()
 
+def resized_bg_path(image_path, size):
+    """
+    Path of the pre-resized copy of an image for a screen size.
+    The source file's modification time is part of the name, so editing
+    the image makes the old copy stale instead of being shown.
+    """
+    name = os.path.splitext(os.path.basename(image_path))[0]
+    stamp = os.stat(image_path).st_mtime_ns
+    return os.path.join(BG_CACHE_DIR, f"{name}-{size[0]}x{size[1]}-{stamp}.ppm")
+
+def save_resized_bg(img, path):
+    """
+    Store a resized background on disk, replacing older copies of it.
+    PPM is used because Tk reads it directly, with no PIL decoding.
+    """
+    try:
+        os.makedirs(BG_CACHE_DIR, exist_ok=True)
+        prefix = os.path.basename(path).rsplit("-", 1)[0] + "-"
+        for old in os.listdir(BG_CACHE_DIR):
+            if old.startswith(prefix):
+                os.remove(os.path.join(BG_CACHE_DIR, old))
+        tmp_path = path + ".tmp"
+        img.save(tmp_path, format="PPM")
+        os.replace(tmp_path, path)  # Never leave a half-written image behind
+    except OSError as e:
+        print(f"[⚠️] Could not cache background: {e}")
+
+def load_bg(image_path, size):
+    """
+    Return a PhotoImage of image_path scaled to size.
+    Tries the in-memory cache first, then the pre-resized copy on disk,
+    and only decodes and resizes the original when neither has it.
+    """
+    key = (image_path, size)
+    if key in bg_photos:
+        bg_photos.move_to_end(key)  # Most recently used
+        return bg_photos[key]
+
+    cached = resized_bg_path(image_path, size)
+    bg_photo = None
+    if os.path.exists(cached):
+        try:
+            bg_photo = tk.PhotoImage(file=cached)
+        except tk.TclError:
+            bg_photo = None  # Damaged copy, rebuild it below
+    if bg_photo is None:
+        img = Image.open(image_path).convert("RGB").resize(size)
+        bg_photo = ImageTk.PhotoImage(img)
+        save_resized_bg(img, cached)
+
+    bg_photos[key] = bg_photo
+    while len(bg_photos) > BG_CACHE_SIZE:
+        bg_photos.popitem(last=False)  # Drop the least recently used
+    return bg_photo
+
+def preload_bg(image_path):
+    """
+    Load a background into the caches ahead of time,
+    so the first page that uses it switches instantly.
+    """
+    try:
+        load_bg(image_path, (window.winfo_screenwidth(), window.winfo_screenheight()))
+    except Exception as e:
+        print(f"[⚠️] Could not preload background: {e}")
+
 def set_bg(image_path):
     """
     Set a background image for the window.
@@ -44,10 +125,9 @@ def set_bg(image_path):
     """
     global bg_label
     try:
-        img = Image.open(image_path).resize(
-            (window.winfo_screenwidth(), window.winfo_screenheight())
-        )
-        bg_photo = ImageTk.PhotoImage(img)
+        bg_photo = load_bg(image_path, (window.winfo_screenwidth(), window.winfo_screenheight()))
+        if bg_label and bg_label.image is bg_photo:
+            return  # Already showing this background
 
         if bg_label:  # Update existing label
             bg_label.config(image=bg_photo)
@@ -60,6 +140,78 @@ def set_bg(image_path):
         print(f"[⚠️] Could not load background: {e}")
         window.configure(bg="#000000")
 
+# ---------------- SCHEDULER ----------------
+# Every animation and timer runs through one scheduler instead of its own after() chain.
+# Tasks carry monotonic deadlines, and repeating tasks advance their deadline by a fixed
+# interval, so slow ticks never add up to drift. Only one window.after() is pending at a
+# time, set for the earliest deadline, and none at all when there is nothing to run.
+tasks = {}                  # Task id -> [deadline, callback, interval in seconds or None]
+task_ids = itertools.count(1)  # Source of task ids
+tick_id = None              # Pending window.after() id, None when idle
+tick_at = None              # Deadline that tick_id was set for
+
+def schedule(callback, delay_ms=0, interval_ms=None):
+    """
+    Run callback after delay_ms, then every interval_ms if given.
+    Returns a task id for cancel().
+    """
+    task_id = next(task_ids)
+    interval = interval_ms / 1000 if interval_ms else None
+    tasks[task_id] = [time.monotonic() + delay_ms / 1000, callback, interval]
+    arm_tick()
+    return task_id
+
+def cancel(task_id):
+    """
+    Stop a scheduled task. Cancelling a finished or unknown task does nothing.
+    """
+    if tasks.pop(task_id, None) is not None:
+        arm_tick()
+
+def cancel_page_tasks():
+    """
+    Cancel every animation and timer, e.g. when the page they belong to is cleared.
+    """
+    global timer_task, next_task
+    tasks.clear()
+    timer_task = next_task = None
+    arm_tick()
+
+def arm_tick():
+    """
+    Make sure the one pending window.after() fires at the earliest deadline.
+    """
+    global tick_id, tick_at
+    due = min((task[0] for task in tasks.values()), default=None)
+    if due == tick_at:
+        return  # Already set for that deadline (or idle with nothing to do)
+    if tick_id is not None:
+        window.after_cancel(tick_id)
+    tick_at = due
+    tick_id = None
+    if due is not None:
+        tick_id = window.after(max(0, math.ceil((due - time.monotonic()) * 1000)), tick)
+
+def tick():
+    """
+    Run every task whose deadline has passed, then wait for the next one.
+    """
+    global tick_id, tick_at
+    tick_id = tick_at = None
+    now = time.monotonic()
+    for task_id in [task_id for task_id, task in tasks.items() if task[0] <= now]:
+        task = tasks.get(task_id)
+        if task is None:
+            continue  # Cancelled by a task that ran earlier in this tick
+        deadline, callback, interval = task
+        if interval:
+            # Next deadline on the original grid; skip beats that were missed entirely
+            task[0] = deadline + interval * max(1, math.ceil((now - deadline) / interval))
+        else:
+            del tasks[task_id]
+        callback()
+    arm_tick()
+
 # ---------------- ANIMATION UTILITIES ----------------
 def animate_color(label, colors, delay=200):
     """
@@ -67,13 +219,17 @@ def animate_color(label, colors, delay=200):
     label: the tk.Label to animate
     colors: list of color hex codes
     delay: milliseconds between color changes
+    Returns the scheduler task id.
     """
-    def loop(i=0):
+    state = {"i": 0}
+    def step():
         if not label.winfo_exists():  # Stop if label no longer exists
+            cancel(task_id)
             return
-        label.config(fg=colors[i])
-        window.after(delay, loop, (i + 1) % len(colors))
-    loop()
+        label.config(fg=colors[state["i"]])
+        state["i"] = (state["i"] + 1) % len(colors)
+    task_id = schedule(step, 0, delay)
+    return task_id
 
 def typewriter_effect(label, text, delay=80):
     """
@@ -81,15 +237,18 @@ def typewriter_effect(label, text, delay=80):
     label: the tk.Label to show text
     text: the string to display
     delay: milliseconds between characters
+    Returns the scheduler task id.
     """
     label.config(text="")
-    def loop(i=0):
-        if not label.winfo_exists():
+    state = {"i": 0}
+    def step():
+        if not label.winfo_exists() or state["i"] > len(text):
+            cancel(task_id)
             return
-        if i <= len(text):
-            label.config(text=text[:i])
-            window.after(delay, loop, i + 1)
-    loop()
+        label.config(text=text[:state["i"]])
+        state["i"] += 1
+    task_id = schedule(step, 0, delay)
+    return task_id
 
 # ---------------- START PAGE ----------------
 def show_start_page():
@@ -178,33 +337,26 @@ def decideOperation():
     return random.choice(["+", "-"])
 
 # ---------------- QUIZ DISPLAY ----------------
-def displayProblem():
+def build_quiz_screen():
     """
-    Display a single math problem with entry box, timer, feedback, and Quit button.
-    Handles first and second attempts.
+    Build the question screen: Quit button, question number, problem, entry,
+    Submit button, feedback, timer and score labels.
+    It is built once per quiz; each question only updates its text.
     """
-    global num1, num2, operation, attempt, feedback_label, timer_label, time_left, timer_id
+    global question_label, q_label, answer_entry, feedback_label, timer_label, score_label
     clear_window()
     set_bg(MAIN_BG)
 
-    attempt = 1
-    time_left = 20
-
-    # Cancel previous timer if exists
-    if timer_id:
-        window.after_cancel(timer_id)
-
     # Quit button → return to main menu
     tk.Button(window, text="🚪 Quit", font=("Segoe UI Semibold", 18), bg="#f44336", fg="white",
               bd=0, command=show_start_page).place(x=20, y=20)
 
-    # Display question number
-    tk.Label(window, text=f"Question {current_question}/10",
-             font=("Impact", 60), bg="#000000", fg="#FFD700").pack(pady=40)
+    # Question number
+    question_label = tk.Label(window, font=("Impact", 60), bg="#000000", fg="#FFD700")
+    question_label.pack(pady=40)
 
-    # Display math question
-    q_label = tk.Label(window, text=f"{num1} {operation} {num2} = ?",
-                       font=("Impact", 70), bg="#000000", fg="#00E5FF")
+    # Math question, glowing for the whole quiz
+    q_label = tk.Label(window, font=("Impact", 70), bg="#000000", fg="#00E5FF")
     q_label.pack(pady=40)
     animate_color(q_label, ["#00E5FF", "#FFD700", "#FF1493"], delay=300)
 
@@ -213,7 +365,6 @@ def displayProblem():
     frame.pack(pady=20)
     answer_entry = tk.Entry(frame, font=("Verdana", 40, "bold"), width=10, justify="center")
     answer_entry.pack(side="left", padx=5)
-    answer_entry.focus()
 
     # Submit button → check answer
     tk.Button(frame, text="Submit", font=("Segoe UI Semibold", 24),
@@ -224,32 +375,75 @@ def displayProblem():
     feedback_label.pack(pady=20)
 
     # Timer label → shows countdown
-    timer_label = tk.Label(window, text=f"⏳ {time_left}s left",
-                           font=("Verdana", 30, "bold"), bg="#000000", fg="red")
+    timer_label = tk.Label(window, font=("Verdana", 30, "bold"), bg="#000000", fg="red")
     timer_label.pack(pady=5)
 
-    countdown()  # Start countdown timer
+    # Score summary
+    score_label = tk.Label(window, font=("Verdana", 22, "bold"), bg="#000000", fg="white")
+    score_label.pack(pady=5)
+
+def displayProblem():
+    """
+    Display a single math problem with entry box, timer, feedback, and Quit button.
+    Handles first and second attempts.
+    The screen is reused from the previous question when it is still up.
+    """
+    global attempt, next_task
+    if question_label is None or not question_label.winfo_exists():
+        build_quiz_screen()
+
+    attempt = 1
+    next_task = None  # This question is now the current one
+
+    question_label.config(text=f"Question {current_question}/10")
+    q_label.config(text=f"{num1} {operation} {num2} = ?")
+    answer_entry.delete(0, "end")
+    answer_entry.focus()
+    feedback_label.config(text="")
+    timer_label.config(text=f"⏳ {QUESTION_SECONDS}s left")
+    score_label.config(text=f"✅ {correct_answers}   ❌ {wrong_answers}   🏆 {score}")
 
-    # Display score summary
-    tk.Label(window, text=f"✅ {correct_answers}   ❌ {wrong_answers}   🏆 {score}",
-             font=("Verdana", 22, "bold"), bg="#000000", fg="white").pack(pady=5)
+    start_timer()
 
 # ---------------- TIMER ----------------
+TIMER_TICK_MS = 100         # How often the countdown checks the clock
+
+def start_timer():
+    """
+    Start the countdown for the current question.
+    The question times out at a fixed monotonic deadline, so however late
+    the ticks run the player always gets exactly QUESTION_SECONDS.
+    """
+    global question_deadline, time_left, timer_task
+    stop_timer()
+    question_deadline = time.monotonic() + QUESTION_SECONDS
+    time_left = QUESTION_SECONDS
+    timer_task = schedule(countdown, TIMER_TICK_MS, TIMER_TICK_MS)
+
+def stop_timer():
+    """
+    Stop the countdown, e.g. once the question has been answered.
+    """
+    global timer_task
+    if timer_task is not None:
+        cancel(timer_task)
+        timer_task = None
+
 def countdown():
     """
     Countdown timer for the current question.
-    Updates timer label every second.
+    Updates timer label when the whole seconds left change.
     If time runs out, moves to next question.
     """
-    global time_left, timer_id
-    if time_left > 0:
-        time_left -= 1
-        if timer_label.winfo_exists():
-            timer_label.config(text=f"⏳ {time_left}s left")
-        timer_id = window.after(1000, countdown)
-    else:
+    global time_left
+    seconds = max(0, math.ceil(question_deadline - time.monotonic()))
+    if seconds != time_left:
+        time_left = seconds
+        timer_label.config(text=f"⏳ {time_left}s left")
+    if time_left == 0:
+        stop_timer()
         feedback_label.config(text="⏰ Time’s up!", fg="orange")
-        window.after(1500, next_question)
+        queue_next_question(1500)
 
 # ---------------- ANSWER CHECK ----------------
 def check_answer(answer):
@@ -258,28 +452,28 @@ def check_answer(answer):
     Update score, feedback, and attempt counter.
     Handles first attempt (10 pts) and second attempt (5 pts).
     """
-    global score, attempt, correct_answers, wrong_answers, timer_id
+    global score, attempt, correct_answers, wrong_answers
 
-    # Stop timer while checking
-    if timer_id:
-        window.after_cancel(timer_id)
-        timer_id = None
+    # Ignore answers once the question is over (answered, or timed out)
+    if next_task is not None or timer_task is None:
+        return
 
     if isCorrect(answer):
+        stop_timer()
         gained = 10 if attempt == 1 else 5
         feedback_label.config(text=f"✅ Correct! +{gained}", fg="lime")
         score += gained
         correct_answers += 1
-        window.after(1200, next_question)
+        queue_next_question(1200)
     else:
         if attempt == 1:
             attempt += 1
-            feedback_label.config(text="❌ Wrong! Try again!", fg="red")
-            countdown()  # Restart timer for second attempt
+            feedback_label.config(text="❌ Wrong! Try again!", fg="red")  # Timer keeps running
         else:
+            stop_timer()
             feedback_label.config(text="❌ Wrong again!", fg="red")
             wrong_answers += 1
-            window.after(1200, next_question)
+            queue_next_question(1200)
 
 def isCorrect(user_answer):
     """
@@ -293,22 +487,30 @@ def isCorrect(user_answer):
     return (num1 + num2 if operation == "+" else num1 - num2) == user_answer
 
 # ---------------- QUESTION FLOW ----------------
+def queue_next_question(delay_ms):
+    """
+    Move on to the next question after delay_ms.
+    Only one move can be queued per question, so a double-clicked Submit
+    or a late timeout can never skip a question.
+    """
+    global next_task
+    if next_task is None:
+        next_task = schedule(next_question, delay_ms)
+
 def next_question():
     """
     Move to the next question or end the quiz if all 10 questions are done.
     """
-    global current_question, num1, num2, operation, timer_id
-    if timer_id:
-        window.after_cancel(timer_id)
-        timer_id = None
+    global current_question, num1, num2, operation, next_task
+    stop_timer()
 
     current_question += 1
     if current_question <= 10:
         num1, num2 = randomInt(level)
         operation = decideOperation()
-        window.after(800, displayProblem)  # Small delay before next question
+        next_task = schedule(displayProblem, 800)  # Small delay before next question
     else:
-        window.after(800, displayResults)  # Show results after last question
+        next_task = schedule(displayResults, 800)  # Show results after last question
 
 # ---------------- RESULTS PAGE ----------------
 def displayResults():
@@ -365,16 +567,19 @@ def start_quiz(chosen_level):
     current_question = 1
     num1, num2 = randomInt(level)
     operation = decideOperation()
+    build_quiz_screen()
     displayProblem()
 
 # ---------------- MAIN WINDOW ----------------
-window = tk.Tk()
-window.title("Ultimate Maths Quiz")
-window.attributes("-fullscreen", True)  # Fullscreen mode
+if __name__ == "__main__":
+    window = tk.Tk()
+    window.title("Ultimate Maths Quiz")
+    window.attributes("-fullscreen", True)  # Fullscreen mode
 
-# Show start page initially
-set_bg(START_BG)
-show_start_page()
+    # Show start page initially
+    set_bg(START_BG)
+    show_start_page()
+    window.after_idle(preload_bg, MAIN_BG)
 
-# Run the main Tkinter loop
-window.mainloop()
+    # Run the main Tkinter loop
+    window.mainloop()
@@ -0,0 +1,99 @@
+import random
+import types
+import unittest
+from unittest import mock
+
+try:
+    import Exercise1_MathsQuiz as quiz
+except ImportError:  # Tkinter or Pillow not installed
+    quiz = None
+
+
+class FakeWindow:
+    # Stands in for the Tk window: keeps the pending after() calls instead of running them
+    def __init__(self):
+        self.pending = {}
+        self.ids = 0
+
+    def after(self, delay_ms, callback):
+        self.ids += 1
+        self.pending[self.ids] = (delay_ms, callback)
+        return self.ids
+
+    def after_cancel(self, after_id):
+        del self.pending[after_id]
+
+
+@unittest.skipIf(quiz is None, "the quiz needs tkinter and Pillow")
+class SchedulerTests(unittest.TestCase):
+    def setUp(self):
+        self.now = 100.0
+        self.window = FakeWindow()
+        patcher = mock.patch.multiple(quiz, window=self.window, tasks={}, tick_id=None, tick_at=None,
+                                      time=types.SimpleNamespace(monotonic=lambda: self.now))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def delays(self):
+        return [delay for delay, _ in self.window.pending.values()]
+
+    def fire(self, late_ms=0):
+        # Let the clock run to the one pending after(), plus some lateness, and run it
+        self.assertEqual(len(self.window.pending), 1)
+        (after_id, (delay_ms, callback)), = self.window.pending.items()
+        del self.window.pending[after_id]
+        self.now += (delay_ms + late_ms) / 1000
+        callback()
+
+    def test_repeating_task_does_not_drift(self):
+        start, runs = self.now, []
+        task_id = quiz.schedule(lambda: runs.append(self.now), 0, 100)
+        rng = random.Random(1)
+        for _ in range(50):
+            self.fire(rng.randint(0, 40))  # Every tick is late, but by less than a beat
+        deadline = quiz.tasks[task_id][0]
+        self.assertEqual(len(runs), 50)
+        self.assertAlmostEqual(deadline, start + 5.0)  # Still on the 100 ms grid
+        self.assertTrue(all(-1e-9 < t - (start + i / 10) < 0.05 for i, t in enumerate(runs)))
+
+    def test_missed_beats_are_skipped(self):
+        runs = []
+        quiz.schedule(lambda: runs.append(self.now), 0, 100)
+        self.fire()
+        self.fire(350)  # A stall of three and a half beats runs the task once, not four times
+        self.assertEqual(len(runs), 2)
+        self.fire()
+        self.assertAlmostEqual(runs[-1] - runs[0], 0.5, delta=0.002)
+
+    def test_one_after_pending_for_the_earliest_task(self):
+        order = []
+        slow = quiz.schedule(lambda: order.append("slow"), 500)
+        quiz.schedule(lambda: order.append("fast"), 100)
+        self.assertEqual(len(self.delays()), 1)
+        self.assertAlmostEqual(self.delays()[0], 100, delta=1)  # after() delays are rounded up to whole ms
+        self.fire()
+        self.assertEqual(len(self.delays()), 1)
+        self.assertAlmostEqual(self.delays()[0], 400, delta=1)
+        quiz.cancel(slow)
+        self.assertEqual(self.window.pending, {})
+        self.assertIsNone(quiz.tick_id)
+        self.assertEqual(order, ["fast"])
+
+    def test_cancel_inside_a_tick(self):
+        order = []
+        def first():
+            order.append("first")
+            quiz.cancel(second)
+            quiz.cancel(repeat)
+        quiz.schedule(first, 10)
+        repeat = quiz.schedule(lambda: order.append("repeat"), 0, 50)
+        second = quiz.schedule(lambda: order.append("second"), 10)
+        self.fire()  # Only the repeating task is due
+        self.fire(50)  # All three are due: first runs and cancels the other two before they run
+        self.assertEqual(order, ["repeat", "first"])
+        self.assertEqual(quiz.tasks, {})
+        self.assertEqual(self.window.pending, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
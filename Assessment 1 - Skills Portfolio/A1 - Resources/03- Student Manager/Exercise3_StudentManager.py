@@ -1,47 +1,1069 @@
-import tkinter as tk
-from tkinter import messagebox
+try:
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
+except ImportError:  # Headless installs can still run the command-line reports
+    tk = filedialog = messagebox = None
+import argparse
+import atexit
+import csv
+import html
+import json
+import mmap
 import os
+import sqlite3
+import struct
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext, redirect_stdout
+from itertools import accumulate, chain, islice
+from operator import add
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 # ---------------- FILE PATHS ----------------
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # Get directory of current script
 FILE_PATH = os.path.join(BASE_DIR, "studentMarks.txt")  # Path to data file
 LOGO_PATH = os.path.join(BASE_DIR, "logo.png")  # Path to logo image
 PERSON_ICON_PATH = os.path.join(BASE_DIR, "person.png")  # Path to person icon image
+JOURNAL_PATH = os.path.join(BASE_DIR, "studentMarks.journal")  # Append-only log of edits
+SNAPSHOT_PATH = os.path.join(BASE_DIR, "studentMarks.bin")  # Binary copy of studentMarks.txt for fast startup
+DB_PATH = os.path.join(BASE_DIR, "studentMarks.db")  # SQLite database used by the "sqlite" backend
+IMPORT_REPORT_PATH = os.path.join(BASE_DIR, "importReport.txt")  # Rejected rows from the last bulk import
+LOCK_PATH = os.path.join(BASE_DIR, "studentMarks.lock")  # Held by the one process allowed to write the records
+METRICS_PATH = os.environ.get("STUDENT_METRICS_FILE", os.path.join(BASE_DIR, "studentMetrics.prom"))  # Timing dump
+COHORTS_DIR = os.environ.get("STUDENT_COHORTS_DIR", os.path.join(BASE_DIR, "cohorts"))  # One marks file per cohort
+
+# ---------------- STORAGE SETTINGS ----------------
+STORAGE_BACKEND = os.environ.get("STUDENT_STORAGE", "text")  # "text" (studentMarks.txt), "sqlite", "service" or "cohorts"
+SERVICE_URL = os.environ.get("STUDENT_SERVICE_URL", "http://127.0.0.1:8765")  # student_service.py address
+SERVICE_TIMEOUT = 30  # Seconds to wait for the student service
+JOURNAL_MODE = True   # Append edits to the journal instead of rewriting studentMarks.txt
+COMPACT_EVERY = 500   # Journal records collected before they are folded into studentMarks.txt
+SAVE_DELAY_MS = 300   # Edits made within this window are written to disk together
+CHUNK_SIZE = 10000    # Records parsed per chunk when streaming studentMarks.txt
+USE_MMAP = False      # Read studentMarks.txt through mmap instead of buffered reads
+USE_SNAPSHOT = True   # Start from studentMarks.bin when it is newer than studentMarks.txt
+IMPORT_WORKERS = os.cpu_count() or 1   # Processes used to parse CSV files in a bulk import
+IMPORT_CHUNK_BYTES = 4 * 1024 * 1024   # Bytes of CSV handed to each import worker task
+EXPORT_WORKERS = os.cpu_count() or 1   # Processes rendering report cards in an export
+EXPORT_BATCH = 1000                    # Report cards rendered per export worker task
+METRICS_ENABLED = os.environ.get("STUDENT_METRICS", "") not in ("", "0")  # Time operations, dump on exit
+COHORT = os.environ.get("STUDENT_COHORT", "")  # Cohort the "cohorts" backend opens first ("" = first by name)
+COHORT_IDLE_SECONDS = 300  # Loaded cohorts unused for this long are dropped from memory
+
+# ---------------- INSTRUMENTATION ----------------
+class OperationMetrics:
+    # Latency histogram, call count and error count per named operation (handlers,
+    # storage functions, widget building, metric math). Off unless STUDENT_METRICS is set,
+    # in which case everything is written to METRICS_PATH in Prometheus text format and
+    # summarised on stderr when the process exits.
+    BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # Seconds
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.lock = threading.Lock()  # Observed from the Tk thread and the I/O worker
+        self.ops = {}  # name -> {"buckets": [count per bucket + overflow], "sum", "max", "errors"}
+        self.counters = {}  # name -> running total, e.g. metric cache hits and misses
+
+    def observe(self, name, seconds, failed=False):
+        with self.lock:
+            op = self.ops.get(name)
+            if op is None:
+                op = self.ops[name] = {"buckets": [0] * (len(self.BUCKETS) + 1), "sum": 0.0, "max": 0.0, "errors": 0}
+            op["buckets"][bisect_left(self.BUCKETS, seconds)] += 1
+            op["sum"] += seconds
+            op["max"] = max(op["max"], seconds)
+            op["errors"] += failed
+
+    def count(self, name, n=1):
+        # Add n to a named counter, dumped next to the timings
+        if self.enabled and n:
+            with self.lock:
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def time(self, name):
+        # Context manager timing the block as one call of name
+        return self._timer(name) if self.enabled else nullcontext()
+
+    @contextmanager
+    def _timer(self, name):
+        start = time.perf_counter()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self.observe(name, time.perf_counter() - start, failed)
+
+    def timed(self, name):
+        # Decorator timing every call of a function; returns it untouched when disabled
+        def decorate(fn):
+            if not self.enabled:
+                return fn
+
+            def wrapper(*args, **kwargs):
+                with self._timer(name):
+                    return fn(*args, **kwargs)
+            wrapper.__name__, wrapper.__doc__, wrapper.__wrapped__ = fn.__name__, fn.__doc__, fn
+            return wrapper
+        return decorate
+
+    def prometheus(self):
+        # Text exposition format: one histogram plus an error counter, labelled by operation
+        lines = ["# HELP student_manager_operation_seconds Time spent in Student Manager operations",
+                 "# TYPE student_manager_operation_seconds histogram"]
+        with self.lock:
+            ops = sorted(self.ops.items())
+            for name, op in ops:
+                total = 0
+                for bound, count in zip(self.BUCKETS + ("+Inf",), op["buckets"]):
+                    total += count
+                    lines.append(f'student_manager_operation_seconds_bucket{{operation="{name}",le="{bound}"}} {total}')
+                lines.append(f'student_manager_operation_seconds_sum{{operation="{name}"}} {op["sum"]:.6f}')
+                lines.append(f'student_manager_operation_seconds_count{{operation="{name}"}} {total}')
+            lines += ["# HELP student_manager_operation_errors_total Operations that raised an exception",
+                      "# TYPE student_manager_operation_errors_total counter"]
+            lines += [f'student_manager_operation_errors_total{{operation="{name}"}} {op["errors"]}'
+                      for name, op in ops]
+            lines += ["# HELP student_manager_events_total Counted events, e.g. metric cache hits and misses",
+                      "# TYPE student_manager_events_total counter"]
+            lines += [f'student_manager_events_total{{event="{name}"}} {count}'
+                      for name, count in sorted(self.counters.items())]
+        return "\n".join(lines) + "\n"
+
+    def _quantile(self, op, q):
+        # Upper bound of the bucket holding the q-th call (a histogram only knows the bucket)
+        target, seen = q * sum(op["buckets"]), 0
+        for bound, count in zip(self.BUCKETS, op["buckets"]):
+            seen += count
+            if seen >= target:
+                return min(bound, op["max"])
+        return op["max"]
+
+    def report(self):
+        # Human-readable table, largest total time first
+        rows = [f"{'operation':<24} {'calls':>7} {'total s':>9} {'mean ms':>9} "
+                f"{'p50<=ms':>8} {'p95<=ms':>8} {'max ms':>9} {'errors':>6}"]
+        with self.lock:
+            for name, op in sorted(self.ops.items(), key=lambda item: -item[1]["sum"]):
+                calls = sum(op["buckets"])
+                rows.append(f"{name:<24} {calls:>7} {op['sum']:>9.3f} {op['sum'] / calls * 1000:>9.2f} "
+                            f"{self._quantile(op, 0.5) * 1000:>8g} {self._quantile(op, 0.95) * 1000:>8g} "
+                            f"{op['max'] * 1000:>9.2f} {op['errors']:>6}")
+            rows += [f"{name:<24} {count:>7}" for name, count in sorted(self.counters.items())]
+        return "\n".join(rows)
+
+    def dump(self, path=None):
+        # Write the Prometheus file and print the summary (registered with atexit when enabled)
+        if not self.ops and not self.counters:
+            return
+        try:
+            with atomic_open(path or METRICS_PATH) as f:
+                f.write(self.prometheus())
+        except OSError as e:
+            print(f"[⚠️] Could not write metrics: {e}", file=sys.stderr)
+        print(self.report(), file=sys.stderr)
+
+METRICS = OperationMetrics(METRICS_ENABLED)
+timed = METRICS.timed
+if METRICS_ENABLED:
+    atexit.register(METRICS.dump)
+
+# ---------------- STUDENT RANKING ----------------
+class StudentRanking:
+    # Students ordered by (percentage, code) in a sorted list. Changes cost a binary
+    # search plus one list insert/remove, and the top or bottom N are plain slices.
+
+    def __init__(self, keys=()):
+        self.keys = sorted(keys)  # (percentage, code) pairs, lowest first
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, pct, code):
+        insort(self.keys, (pct, code))
+
+    def remove(self, pct, code):
+        i = bisect_left(self.keys, (pct, code))
+        if i < len(self.keys) and self.keys[i] == (pct, code):
+            del self.keys[i]
+
+    def top(self, n):
+        # Codes of the n highest-scoring students, best first
+        return [code for pct, code in reversed(self.keys[-n:])] if n > 0 else []
+
+    def bottom(self, n):
+        # Codes of the n lowest-scoring students, worst first
+        return [code for pct, code in self.keys[:n]]
+
+# ---------------- COHORT STATISTICS ----------------
+class CohortStats:
+    # Streaming aggregate over the cohort, built in one pass and then updated per
+    # add/update/delete. Every mark is a small integer, so exact count histograms
+    # (one per component plus the total out of 160) give the mean, median,
+    # percentiles and grade distribution exactly, in memory that does not grow
+    # with the cohort.
+    COMPONENTS = ("c1", "c2", "c3", "exam", "total")
+
+    def __init__(self):
+        self.count = 0
+        self.hist = {name: Counter() for name in self.COMPONENTS}  # mark -> number of students
+
+    def add(self, c1, c2, c3, exam, sign=1):
+        # Count one student in (or out, with sign=-1)
+        self.count += sign
+        for name, mark in zip(self.COMPONENTS, (c1, c2, c3, exam, c1 + c2 + c3 + exam)):
+            hist = self.hist[name]
+            hist[mark] += sign
+            if hist[mark] == 0:
+                del hist[mark]
+
+    def remove(self, c1, c2, c3, exam):
+        self.add(c1, c2, c3, exam, sign=-1)
+
+    def mean(self, name):
+        if not self.count:
+            return 0.0
+        return sum(mark * n for mark, n in self.hist[name].items()) / self.count
+
+    def stdev(self, name):
+        # Population standard deviation
+        if not self.count:
+            return 0.0
+        mean = self.mean(name)
+        return (sum(n * (mark - mean) ** 2 for mark, n in self.hist[name].items()) / self.count) ** 0.5
+
+    def percentile(self, name, p):
+        # p-th percentile (0-100), interpolating between neighbouring students like
+        # statistics.quantiles(method="inclusive")
+        if not self.count:
+            return 0.0
+        rank = (self.count - 1) * p / 100
+        lower_rank, frac = int(rank), rank - int(rank)
+        lower = upper = None
+        seen = 0
+        for mark in sorted(self.hist[name]):
+            seen += self.hist[name][mark]
+            if lower is None and seen > lower_rank:
+                lower = mark
+            if seen > lower_rank + 1 or (frac == 0 and lower is not None):
+                upper = mark
+                break
+        if upper is None:
+            upper = lower
+        return lower + (upper - lower) * frac
+
+    def median(self, name):
+        return self.percentile(name, 50)
+
+    def minimum(self, name):
+        return min(self.hist[name]) if self.count else 0
+
+    def maximum(self, name):
+        return max(self.hist[name]) if self.count else 0
+
+    def percentage_histogram(self, width=10):
+        # Number of students per percentage band of the given width: [(band start, count), ...]
+        bands = Counter()
+        for total, n in self.hist["total"].items():
+            bands[min(int(_percentage_of(total) // width) * width, 100 - width)] += n
+        return [(start, bands[start]) for start in range(0, 100, width)]
+
+    def grade_distribution(self):
+        # Number of students per grade letter
+        grades = Counter({letter: 0 for letter in "ABCDF"})
+        for total, n in self.hist["total"].items():
+            grades[grade(_percentage_of(total))] += n
+        return grades
+
+    def mean_percentage(self):
+        return round(self.mean("total") / 160 * 100, 2)
+
+    def percentage_percentile(self, p):
+        return round(self.percentile("total", p) / 160 * 100, 2)
+
+# ---------------- STUDENT SEARCH ----------------
+SEARCH_BUILDER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search-index")  # Builds SearchTables off the Tk thread
+
+class SearchTables:
+    # Lookup tables built from one snapshot of a StudentStore's columns:
+    #   - distinct names casefolded and sorted, so a name prefix is a bisect range
+    #   - the same names joined into one string and cut into blocks of BLOCK names, with
+    #     trigram -> block postings, so a substring search only runs str.find over the
+    #     blocks holding every trigram of the query (bisect maps each hit to its name)
+    #   - (name id, row) pairs packed into one sorted array, so a name resolves to rows by bisect
+    #   - codes sorted, so a code prefix is a bisect range (the store's code index gives the row)
+    BLOCK = 1024
+    ROW_MASK = 0xFFFFFFFF
+
+    def __init__(self, names, code, name_id):
+        folded = [name.casefold() for name in names]
+        by_name = sorted(range(len(folded)), key=folded.__getitem__)
+        self.sorted_names = [folded[n] for n in by_name]
+        self.sorted_name_ids = array("i", by_name)
+
+        self.blob = "\n".join(folded)
+        self.starts = array("l", accumulate((len(name) + 1 for name in folded), initial=0))
+        self.starts[-1] = len(self.blob)  # End of the last name, so block b ends at starts[(b + 1) * BLOCK]
+        self.grams = {}  # (c1, c2, c3) -> ids of the blocks containing it, ascending
+        for block, first in enumerate(range(0, len(folded), self.BLOCK)):
+            text = f"\n{self.blob[self.starts[first]:self._block_end(block)]}\n"
+            for gram in set(zip(text, text[1:], text[2:])):
+                postings = self.grams.get(gram)
+                if postings is None:
+                    postings = self.grams[gram] = array("i")
+                postings.append(block)
+
+        self.rows_by_name = array("q", sorted(n << 32 | row for row, n in enumerate(name_id)))
+        self.sorted_codes = array("i", sorted(code))
+
+    def remap(self, inverse):
+        # Follow a reorder of the store's rows (old row r is now inverse[r]). Only the name
+        # half of each pair has to stay sorted for the bisects, so no re-sort is needed.
+        # Rows deleted since the snapshot are past the end of the store and stay as they are.
+        mask, size = self.ROW_MASK, len(inverse)
+        self.rows_by_name = array("q", [v & ~mask | inverse[v & mask] if v & mask < size else v
+                                        for v in self.rows_by_name])
+
+    def rows_for_name(self, name_id):
+        lo = bisect_left(self.rows_by_name, name_id << 32)
+        hi = bisect_left(self.rows_by_name, (name_id + 1) << 32)
+        mask = self.ROW_MASK
+        return [v & mask for v in self.rows_by_name[lo:hi]]
+
+    def code_prefix(self, digits):
+        # Codes starting with the given digits
+        prefix = int(digits)
+        max_digits = len(str(self.sorted_codes[-1])) if self.sorted_codes else 0
+        widths = [0] if digits.startswith("0") else range(max_digits - len(digits) + 1)
+        for extra in widths:
+            scale = 10 ** extra
+            lo = bisect_left(self.sorted_codes, prefix * scale)
+            hi = bisect_left(self.sorted_codes, (prefix + 1) * scale)
+            yield from self.sorted_codes[lo:hi]
+
+    def name_prefix(self, query):
+        # Ids of the names starting with query, in name order
+        i = bisect_left(self.sorted_names, query)
+        while i < len(self.sorted_names) and self.sorted_names[i].startswith(query):
+            yield self.sorted_name_ids[i]
+            i += 1
+
+    def _block_end(self, block):
+        return self.starts[min((block + 1) * self.BLOCK, len(self.starts) - 1)]
+
+    def name_substring(self, query):
+        # Ids of the names containing query somewhere after their first character
+        if len(query) >= 3:
+            postings = [self.grams.get(gram) for gram in zip(query, query[1:], query[2:])]
+            if not all(postings):
+                return
+            blocks = set(min(postings, key=len)).intersection(*postings)
+        else:
+            # Too short to hold a trigram: any block with a trigram containing it may match
+            blocks = set(chain.from_iterable(
+                postings for gram, postings in self.grams.items() if query in "".join(gram)))
+        for block in sorted(blocks):
+            end = self._block_end(block)
+            pos = self.blob.find(query, self.starts[block * self.BLOCK], end)
+            while pos != -1:
+                name_id = bisect_right(self.starts, pos) - 1
+                if pos != self.starts[name_id]:  # Prefix matches come from name_prefix()
+                    yield name_id
+                pos = self.blob.find(query, self.starts[name_id + 1], end)
+
+class StudentSearchIndex:
+    # Search over a live StudentStore: SearchTables built on SEARCH_BUILDER from a snapshot,
+    # plus the rows changed since that snapshot, which are matched directly at query time.
+    # The store reports every change, so an edit never rebuilds anything on the Tk thread;
+    # once the changed rows outgrow REBUILD_AT a fresh snapshot is indexed in the background.
+    REBUILD_AT = 4096
+
+    def __init__(self, students):
+        self.students = students
+        self.tables = None    # SearchTables of the last finished snapshot
+        self.dirty = set()    # Rows whose contents differ from that snapshot
+        self.pending = None   # (future, rows changed since its snapshot) while a rebuild runs
+        self.rebuild()
+
+    def rebuild(self):
+        # Start indexing a snapshot of the store on the builder thread
+        s = self.students
+        self.pending = (SEARCH_BUILDER.submit(SearchTables, s.names[:], s.code[:], s.name_id[:]), set())
+
+    def changed(self, rows):
+        # Note rows that were added, updated or refilled by a swap-remove
+        self.dirty.update(rows)
+        if self.pending is not None:
+            self.pending[1].update(rows)
+        elif len(self.dirty) > self.REBUILD_AT:
+            self.rebuild()
+
+    def reordered(self, order):
+        # The store's rows were permuted (new row i was row order[i])
+        inverse = array("l", bytes(8 * len(order)))
+        for new, old in enumerate(order):
+            inverse[old] = new
+        if self.tables is not None:
+            self.tables.remap(inverse)
+            self.dirty = {inverse[row] for row in self.dirty if row < len(inverse)}
+        if self.pending is not None:  # Its snapshot has the old order, so take a new one
+            self.rebuild()
+
+    def _refresh(self):
+        # Swap in a finished rebuild, waiting for it only if there is nothing to search yet
+        if self.pending is None:
+            return
+        future, dirty = self.pending
+        if self.tables is None or future.done():
+            self.tables = future.result()
+            self.dirty = dirty
+            self.pending = None
+
+    @staticmethod
+    def _code_matches(code, digits):
+        # Same rule as SearchTables.code_prefix: a leading zero only matches that exact number
+        return code == int(digits) if digits.startswith("0") else str(code).startswith(digits)
+
+    def search(self, query, limit):
+        # Row indexes matching query by code prefix (digits) or name prefix/substring
+        query = query.strip().casefold()
+        if not query:
+            return []
+        self._refresh()
+        s, tables, dirty = self.students, self.tables, self.dirty
+        size = len(s)
+        changed = sorted(row for row in dirty if row < size)
+        rows = []
+        seen = set()
+
+        def take(found):
+            for row in found:
+                if row not in seen:
+                    seen.add(row)
+                    rows.append(row)
+                    if len(rows) >= limit:
+                        return True
+            return False
+
+        def unchanged(found):
+            # Rows from the snapshot that still hold what was indexed
+            return (row for row in found if row < size and row not in dirty)
+
+        if query.isdigit():
+            index = s._index
+            if take(unchanged(index.get(code, size) for code in tables.code_prefix(query))):
+                return rows
+            if take(row for row in changed if self._code_matches(s.code[row], query)):
+                return rows
+
+        folded = {row: s.names[s.name_id[row]].casefold() for row in changed}
+        for name_id in tables.name_prefix(query):
+            if take(unchanged(tables.rows_for_name(name_id))):
+                return rows
+        if take(row for row in changed if folded[row].startswith(query)):
+            return rows
+        for name_id in tables.name_substring(query):
+            if take(unchanged(tables.rows_for_name(name_id))):
+                return rows
+        take(row for row in changed if query in folded[row])
+        return rows
+
+# ---------------- STUDENT STORE ----------------
+class StudentStore:
+    # Columnar store: one typed array per numeric field plus an interned name table.
+    # Rows are handed out as plain dicts so the GUI can keep using s["name"], s["code"] etc.
+    # A code -> row index dict gives O(1) lookups and keeps student codes unique.
+    COLUMNS = ("code", "name_id", "c1", "c2", "c3", "exam")
+    TYPECODES = {"code": "i", "name_id": "i", "c1": "h", "c2": "h", "c3": "h", "exam": "h"}
+
+    def __init__(self):
+        self.code = array(self.TYPECODES["code"])        # Student codes (1000-9999)
+        self.c1 = array(self.TYPECODES["c1"])            # Coursework 1 (out of 20)
+        self.c2 = array(self.TYPECODES["c2"])            # Coursework 2 (out of 20)
+        self.c3 = array(self.TYPECODES["c3"])            # Coursework 3 (out of 20)
+        self.exam = array(self.TYPECODES["exam"])        # Exam mark (out of 100)
+        self.name_id = array(self.TYPECODES["name_id"])  # Index into self.names for each row
+        self.names = []             # Interned name table, each distinct name stored once
+        self._name_ids = {}         # name -> position in self.names
+        self._index = {}            # student code -> row index
+        self._ranking = None        # StudentRanking, built on first use then kept up to date
+        self._search = None         # StudentSearchIndex, started on first use then told about every change
+        self._stats = None          # CohortStats, built on first use then kept up to date
+        self.version = 0            # Bumped on every change to the rows
+        self._metrics = None        # [totals, percentages, grades] per row, built on first use
+        self.metric_hits = 0        # Reads served from the metrics cache (a column or one row)
+        self.metric_misses = 0      # Rows whose metrics were (re)computed
+        self.load_errors = []       # (line_number, line, reason) for lines skipped on load
+        self.cohort = None          # Cohort name when loaded by the "cohorts" backend
+
+    def __len__(self):
+        return len(self.code)
+
+    def __contains__(self, code):
+        return code in self._index
+
+    def __iter__(self):
+        # Yield each row as a dict (a snapshot, edits go through update())
+        for i in range(len(self.code)):
+            yield self.row(i)
+
+    def _intern_name(self, name):
+        # Return the table id for a name, adding it on first sight
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = len(self.names)
+            self.names.append(sys.intern(name))
+            self._name_ids[name] = name_id
+        return name_id
+
+    def row(self, i):
+        # Build the dict view of row i
+        return {
+            "code": self.code[i],
+            "name": self.names[self.name_id[i]],
+            "c1": self.c1[i],
+            "c2": self.c2[i],
+            "c3": self.c3[i],
+            "exam": self.exam[i]
+        }
+
+    @staticmethod
+    def _packed(s):
+        # Pack the numeric fields first so an out-of-range value raises OverflowError
+        # before any column has been touched
+        return array("i", (s["code"],))[0], array("h", (s["c1"], s["c2"], s["c3"], s["exam"]))
+
+    def append(self, s):
+        # Add a record given as a dict with code/name/c1/c2/c3/exam keys
+        self.add_row(s["code"], s["name"], s["c1"], s["c2"], s["c3"], s["exam"])
+
+    def add_row(self, code, name, c1, c2, c3, exam):
+        # Add a record from its field values (no intermediate dict)
+        code, marks = self._packed({"code": code, "c1": c1, "c2": c2, "c3": c3, "exam": exam})
+        if code in self._index:
+            raise ValueError(f"Student code {code} already exists.")
+        self._index[code] = len(self.code)
+        self.code.append(code)
+        self.name_id.append(self._intern_name(name))
+        self.c1.append(marks[0])
+        self.c2.append(marks[1])
+        self.c3.append(marks[2])
+        self.exam.append(marks[3])
+        self._refresh_metrics(len(self.code) - 1)
+        if self._stats is not None:
+            self._stats.add(*marks)
+        self.version += 1
+        if self._ranking is not None:
+            self._ranking.add(self.percentage_at(len(self.code) - 1), code)
+        if self._search is not None:
+            self._search.changed((len(self.code) - 1,))
+
+    def find(self, code):
+        # Return the row index of a student code, or -1 if not present
+        return self._index.get(code, -1)
+
+    def update(self, i, s):
+        # Overwrite row i with the values in dict s
+        code, marks = self._packed(s)
+        old_code = self.code[i]
+        old_pct = self.percentage_at(i)
+        if code != old_code and code in self._index:
+            raise ValueError(f"Student code {code} already exists.")
+        if self._stats is not None:
+            self._stats.remove(self.c1[i], self.c2[i], self.c3[i], self.exam[i])
+            self._stats.add(*marks)
+        if code != old_code:
+            del self._index[old_code]
+            self._index[code] = i
+        self.code[i] = code
+        self.name_id[i] = self._intern_name(s["name"])
+        self.c1[i] = marks[0]
+        self.c2[i] = marks[1]
+        self.c3[i] = marks[2]
+        self.exam[i] = marks[3]
+        self._refresh_metrics(i)
+        self.version += 1
+        if self._ranking is not None:
+            self._ranking.remove(old_pct, old_code)
+            self._ranking.add(self.percentage_at(i), code)
+        if self._search is not None:
+            self._search.changed((i,))
+
+    def delete(self, i):
+        # Remove row i in O(1) by moving the last row into its slot (swap-remove),
+        # so only one index entry has to change
+        last = len(self.code) - 1
+        if self._ranking is not None:
+            self._ranking.remove(self.percentage_at(i), self.code[i])
+        if self._stats is not None:
+            self._stats.remove(self.c1[i], self.c2[i], self.c3[i], self.exam[i])
+        del self._index[self.code[i]]
+        if i != last:
+            self._index[self.code[last]] = i
+        for col in [getattr(self, attr) for attr in self.COLUMNS] + (self._metrics or []):
+            col[i] = col[last]
+            del col[last]
+        self.version += 1
+        if self._search is not None and i != last:
+            self._search.changed((i,))
+
+    def extend(self, other):
+        # Append every row of another store column by column, e.g. the rows of a bulk import
+        clash = next((code for code in other.code if code in self._index), None)
+        if clash is not None:
+            raise ValueError(f"Student code {clash} already exists.")
+        start = len(self.code)
+        ids = [self._intern_name(name) for name in other.names]  # other's name ids -> ours
+        self.name_id.extend(map(ids.__getitem__, other.name_id))
+        for attr in ("code", "c1", "c2", "c3", "exam"):
+            getattr(self, attr).extend(getattr(other, attr))
+        self._index.update(zip(other.code, range(start, len(self.code))))
+        if self._metrics is not None:
+            for col, extra in zip(self._metrics, other._cached_metrics()):
+                col.extend(extra)
+            self._count_metrics(misses=len(other))
+        if self._stats is not None:
+            for marks in zip(other.c1, other.c2, other.c3, other.exam):
+                self._stats.add(*marks)
+        self._ranking = None  # Re-sorting once beats len(other) inserts into the sorted list
+        self.version += 1
+        if self._search is not None:
+            self._search.changed(range(start, len(self.code)))
+
+    @classmethod
+    def from_columns(cls, code, name_id, c1, c2, c3, exam, names):
+        # Build a store directly from ready-made column arrays and a name table
+        store = cls()
+        store.code, store.name_id = code, name_id
+        store.c1, store.c2, store.c3, store.exam = c1, c2, c3, exam
+        store.names = [sys.intern(name) for name in names]
+        store._name_ids = {name: i for i, name in enumerate(store.names)}
+        store._index = dict(zip(code, range(len(code))))
+        return store
+
+    def copy(self):
+        # Independent copy of the store, e.g. a snapshot for a background writer
+        other = StudentStore()
+        for attr in self.COLUMNS:
+            setattr(other, attr, getattr(self, attr)[:])
+        other.names = self.names[:]
+        other._name_ids = dict(self._name_ids)
+        other._index = dict(self._index)
+        other.cohort = self.cohort
+        return other
+
+    def sort_by(self, keys, reverse=False):
+        # Reorder every column by a per-row key sequence (e.g. percentages())
+        order = sorted(range(len(keys)), key=keys.__getitem__, reverse=reverse)
+        for attr in self.COLUMNS:
+            col = getattr(self, attr)
+            setattr(self, attr, array(col.typecode, map(col.__getitem__, order)))
+        self._index = {code: i for i, code in enumerate(self.code)}
+        self.version += 1
+        if self._search is not None:
+            self._search.reordered(order)
+        if self._metrics is not None:  # Same records, so the cached metrics just move with them
+            totals, pcts, grades = self._metrics
+            self._metrics = [array(totals.typecode, map(totals.__getitem__, order)),
+                             array(pcts.typecode, map(pcts.__getitem__, order)),
+                             list(map(grades.__getitem__, order))]
+
+    # ---- Ranking ----
+    def ranking(self):
+        # The StudentRanking for this store, sorted once then maintained by add/update/delete
+        if self._ranking is None:
+            self._ranking = StudentRanking(zip(self.percentages(), self.code))
+        return self._ranking
+
+    def top(self, n):
+        # Rows of the n highest-scoring students, best first
+        return [self.row(self._index[code]) for code in self.ranking().top(n)]
+
+    def bottom(self, n):
+        # Rows of the n lowest-scoring students, worst first
+        return [self.row(self._index[code]) for code in self.ranking().bottom(n)]
+
+    # ---- Statistics ----
+    def stats(self):
+        # The CohortStats for this store, built in one pass then maintained by add/update/delete
+        if self._stats is None:
+            stats = CohortStats()
+            for marks in zip(self.c1, self.c2, self.c3, self.exam):
+                stats.add(*marks)
+            self._stats = stats
+        return self._stats
+
+    # ---- Search ----
+    def prepare_search(self):
+        # Start indexing the rows in the background, ready for the first search
+        if self._search is None:
+            self._search = StudentSearchIndex(self)
+
+    @timed("search")
+    def search(self, query, limit):
+        # Row indexes of up to limit students matching query (see StudentSearchIndex)
+        self.prepare_search()
+        return self._search.search(query, limit)
+
+    # ---- Sort views ----
+    SORT_FIELDS = ("name", "code", "exam", "coursework", "percentage")
+
+    def sort_key(self, field):
+        # Per-row key array for one of SORT_FIELDS
+        if field == "name":
+            # Rank each distinct name once, then look the ranks up per row. Names that
+            # differ only in case share a rank, so the next sort key decides between them.
+            folded = [name.casefold() for name in self.names]
+            rank_of = {name: rank for rank, name in enumerate(sorted(set(folded)))}
+            ranks = array("i", map(rank_of.__getitem__, folded))
+            return array("i", map(ranks.__getitem__, self.name_id))
+        if field == "code":
+            return self.code
+        if field == "exam":
+            return self.exam
+        if field == "coursework":
+            return self.totals()
+        if field == "percentage":
+            return self.percentages()
+        raise ValueError(f"Unknown sort field {field!r}")
+
+    @timed("sort_view")
+    def sorted_order(self, keys):
+        # Row indexes ordered by a list of (field, descending) keys, first key most
+        # significant. The rows themselves (and the file) are left untouched.
+        order = list(range(len(self.code)))
+        for field, descending in reversed(keys):  # Stable sorts, least significant first
+            order.sort(key=self.sort_key(field).__getitem__, reverse=descending)
+        return array("i", order)
+
+    def sort_value(self, field, i):
+        # Row i's value for one of SORT_FIELDS, comparable without building a whole key array
+        if field == "name":  # Same order as the name ranks in sort_key
+            return self.names[self.name_id[i]].casefold()
+        if field == "coursework":
+            return self.totals()[i]
+        if field == "percentage":
+            return self.percentages()[i]
+        return self.sort_key(field)[i]
+
+    def insert_position(self, order, i, keys):
+        # Position row i belongs at in order (a sorted_order(keys) view without row i),
+        # found by binary search so one changed row never needs a full re-sort
+        def before(a, b):
+            for field, descending in keys:
+                va, vb = self.sort_value(field, a), self.sort_value(field, b)
+                if va != vb:
+                    return va > vb if descending else va < vb
+            return a < b  # Ties keep stored order, as the stable sort does
+
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if before(order[mid], i):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    # ---- Derived metrics, computed in batch and cached per row ----
+    # The cache is built over whole columns on first use; after that only rows changed
+    # by append/update are recomputed. The returned columns are the cache itself and
+    # must be treated as read-only.
+    def _count_metrics(self, hits=0, misses=0):
+        # Per-store counters (metric_stats) plus the totals in the metrics dump
+        self.metric_hits += hits
+        self.metric_misses += misses
+        METRICS.count("metric_cache_hits", hits)
+        METRICS.count("metric_cache_misses", misses)
+
+    def _cached_metrics(self):
+        if self._metrics is None:
+            self._metrics = self._build_metrics()
+            self._count_metrics(misses=len(self.code))
+        else:
+            self._count_metrics(hits=1)
+        return self._metrics
+
+    @timed("metrics_build")
+    def _build_metrics(self):
+        # Totals, percentages and grades for every row, computed column-wise
+        totals = array("h", map(add, map(add, self.c1, self.c2), self.c3))
+        pcts = array("d", map(_percentage_of, map(add, totals, self.exam)))
+        return [totals, pcts, list(map(grade, pcts))]
+
+    def _refresh_metrics(self, i):
+        # Recompute the cached metrics of row i after it was added or changed
+        if self._metrics is None:
+            return
+        total = self.c1[i] + self.c2[i] + self.c3[i]
+        pct = _percentage_of(total + self.exam[i])
+        values = (total, pct, grade(pct))
+        for col, value in zip(self._metrics, values):
+            if i == len(col):
+                col.append(value)
+            else:
+                col[i] = value
+        self._count_metrics(misses=1)
+
+    def metrics(self, i):
+        # (total coursework, percentage, grade) of row i
+        totals, pcts, grades = self._cached_metrics()
+        return totals[i], pcts[i], grades[i]
+
+    def metric_stats(self):
+        # Cache counters, to check metrics are computed once per change rather than per render
+        return {"hits": self.metric_hits, "misses": self.metric_misses}
+
+    def percentage_at(self, i):
+        # Overall percentage of row i
+        return self.metrics(i)[1]
+
+    def totals(self):
+        # Total coursework for every row
+        return self._cached_metrics()[0]
+
+    def percentages(self):
+        # Overall percentage for every row (same rounding as overall_percentage)
+        return self._cached_metrics()[1]
+
+    def grades(self, percentages=None):
+        # Grade letter for every row
+        if percentages is not None:
+            return list(map(grade, percentages))
+        return self._cached_metrics()[2]
 
 # ---------------- DATA HANDLING ----------------
-def load_students():
-    # Load students data from the text file into a list of dictionaries
-    students = []
-    if not os.path.exists(FILE_PATH):
-        return students  # Return empty list if file doesn't exist
-    with open(FILE_PATH, "r") as f:
-        lines = f.read().strip().split("\n")
-        for line in lines[1:]:  # Skip first line (count)
-            parts = line.split(",")
-            students.append({
-                "code": int(parts[0]),
-                "name": parts[1],
-                "c1": int(parts[2]),
-                "c2": int(parts[3]),
-                "c3": int(parts[4]),
-                "exam": int(parts[5])
-            })
+def iter_student_lines(path, use_mmap=USE_MMAP):
+    # Yield (line_number, raw bytes line, bytes read so far) without holding the file in memory
+    with open(path, "rb") as f:
+        if use_mmap and os.path.getsize(path) > 0:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield from _numbered_lines(iter(mm.readline, b""))
+        else:
+            yield from _numbered_lines(f)
+
+def _numbered_lines(lines):
+    done = 0
+    for line_no, line in enumerate(lines, 1):
+        done += len(line)
+        yield line_no, line, done
+
+def parse_student_line(line):
+    # Parse one "code,name,c1,c2,c3,exam" line into a tuple, raising ValueError if malformed
+    parts = line.strip().split(",")
+    if len(parts) != 6:
+        raise ValueError(f"expected 6 fields, found {len(parts)}")
+    if parts[1].strip() == "":
+        raise ValueError("name is empty")
+    return (int(parts[0]), parts[1], int(parts[2]), int(parts[3]), int(parts[4]), int(parts[5]))
+
+def iter_student_chunks(path=None, chunk_size=CHUNK_SIZE, use_mmap=USE_MMAP, on_bad_line=None, on_progress=None):
+    # Stream studentMarks.txt as lists of up to chunk_size (line_number, record) pairs.
+    # Malformed lines are skipped and passed to on_bad_line(line_number, line, reason);
+    # on_progress(bytes_read, total_bytes) is called once per chunk.
+    path = path or FILE_PATH
+    total = os.path.getsize(path)
+    chunk = []
+    done = 0
+    for line_no, raw, done in iter_student_lines(path, use_mmap):
+        if line_no == 1:
+            continue  # First line is the student count
+        line = raw.decode("utf-8", errors="replace").strip()
+        if line == "":
+            continue
+        try:
+            chunk.append((line_no, parse_student_line(line)))
+        except ValueError as e:
+            if on_bad_line:
+                on_bad_line(line_no, line, str(e))
+            continue
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+            if on_progress:
+                on_progress(done, total)
+    if chunk:
+        yield chunk
+    if on_progress:
+        on_progress(total, total)
+
+@timed("load_students")
+def load_students(on_progress=None, read_only=False):
+    # Load students data into a columnar StudentStore, from the binary snapshot when it is
+    # up to date, otherwise from the text file (refreshing the snapshot afterwards unless
+    # read_only, which leaves every data file as it was)
+    # Bad lines are skipped and listed in students.load_errors as (line_number, line, reason)
+    students = None
+    if USE_SNAPSHOT and snapshot_is_fresh():
+        students = load_snapshot()
+        if students is not None and on_progress:
+            on_progress(1, 1)
+    if students is None:
+        students = load_students_text(on_progress)
+        # Only snapshot a clean parse, so skipped lines keep being reported
+        if USE_SNAPSHOT and not read_only and os.path.exists(FILE_PATH) and not students.load_errors:
+            try:
+                save_snapshot(students)
+            except OSError as e:
+                print(f"[⚠️] Could not write snapshot: {e}")
+    if JOURNAL_MODE:
+        JOURNAL.replay(students, read_only)  # Apply edits made since the last compaction
     return students
 
-def save_students(students):
-    # Save the students list back to the text file in the expected format
-    with open(FILE_PATH, "w") as f:
+@timed("load_students_text")
+def load_students_text(on_progress=None, path=None):
+    # Parse studentMarks.txt (or another file in the same format) into a StudentStore
+    path = path or FILE_PATH
+    students = StudentStore()
+    if not os.path.exists(path):
+        return students  # Return empty store if file doesn't exist
+
+    def bad_line(line_no, line, reason):
+        students.load_errors.append((line_no, line, reason))
+        print(f"[⚠️] Skipped line {line_no}: {reason}")
+
+    for chunk in iter_student_chunks(path, on_bad_line=bad_line, on_progress=on_progress):
+        for line_no, rec in chunk:
+            if rec[0] in students:  # Duplicate code, keep the first occurrence
+                bad_line(line_no, ",".join(map(str, rec)), f"duplicate student code {rec[0]}")
+                continue
+            try:
+                students.add_row(*rec)
+            except OverflowError:
+                bad_line(line_no, ",".join(map(str, rec)), "value out of range")
+    return students
+
+def _file_mode(path):
+    # Permission bits for a rewrite of path: those it already has, or what a plain
+    # open() would give a new file under the current umask
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+@contextmanager
+def atomic_open(path, mode="w"):
+    # Open a temp file beside path and rename it over path once the block succeeds,
+    # so an interrupted write never leaves a truncated file behind
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, _file_mode(path))  # mkstemp files are owner-only
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+@timed("save_students")
+def save_students(students, path=None):
+    # Save the students store back to the text file in the expected format
+    with atomic_open(path or FILE_PATH) as f:
         f.write(str(len(students)) + "\n")  # First line is total count
         for s in students:
             f.write(f"{s['code']},{s['name']},{s['c1']},{s['c2']},{s['c3']},{s['exam']}\n")
 
+# ---------------- BINARY SNAPSHOT ----------------
+# studentMarks.bin holds the same records as studentMarks.txt, laid out so it can be
+# memory-mapped and copied straight into the store's arrays with no per-field parsing:
+#   header | code (int32 x n) | name_id (int32 x n) | c1, c2, c3, exam (int16 x n each) | names
+# The names block is the UTF-8 name table joined by newlines. The header carries the
+# record count, name count and a CRC32 of everything after the header.
+SNAPSHOT_MAGIC = b"SMSB"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<4sHBxIII")  # magic, version, big-endian flag, count, names, crc32
+
+def snapshot_is_fresh(path=None, text_path=None):
+    # True when the snapshot exists and is at least as new as the text file
+    path = path or SNAPSHOT_PATH
+    text_path = text_path or FILE_PATH
+    if not os.path.exists(path) or not os.path.exists(text_path):
+        return False
+    return os.stat(path).st_mtime_ns >= os.stat(text_path).st_mtime_ns
+
+@timed("save_snapshot")
+def save_snapshot(students, path=None):
+    # Write the store as a binary snapshot (atomically, like save_students)
+    names = "\n".join(students.names).encode("utf-8")
+    blocks = [getattr(students, attr).tobytes() for attr in StudentStore.COLUMNS] + [names]
+    crc = 0
+    for block in blocks:
+        crc = zlib.crc32(block, crc)
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, sys.byteorder == "big",
+                                  len(students), len(students.names), crc)
+    with atomic_open(path or SNAPSHOT_PATH, "wb") as f:
+        f.write(header)
+        for block in blocks:
+            f.write(block)
+
+@timed("load_snapshot")
+def load_snapshot(path=None):
+    # Read a binary snapshot into a StudentStore, or return None if it is missing or invalid
+    path = path or SNAPSHOT_PATH
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if len(mm) < SNAPSHOT_HEADER.size:
+                raise ValueError("file too short")
+            magic, version, big_endian, count, name_count, crc = SNAPSHOT_HEADER.unpack_from(mm, 0)
+            if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                raise ValueError("not a student snapshot")
+            body = memoryview(mm)[SNAPSHOT_HEADER.size:]
+            try:
+                if zlib.crc32(body) != crc:
+                    raise ValueError("checksum mismatch")
+                columns = []
+                offset = 0
+                for attr in StudentStore.COLUMNS:
+                    col = array(StudentStore.TYPECODES[attr])
+                    size = count * col.itemsize
+                    if offset + size > len(body):
+                        raise ValueError("file too short")
+                    col.frombytes(body[offset:offset + size])
+                    if big_endian != (sys.byteorder == "big"):
+                        col.byteswap()
+                    columns.append(col)
+                    offset += size
+                names = bytes(body[offset:]).decode("utf-8").split("\n") if name_count else []
+            finally:
+                body.release()
+    except (OSError, ValueError) as e:
+        if os.path.exists(path):
+            print(f"[⚠️] Ignoring student snapshot: {e}")
+        return None
+    if len(names) != name_count:
+        print("[⚠️] Ignoring student snapshot: name table size mismatch")
+        return None
+    return StudentStore.from_columns(*columns, names)
+
 def total_coursework(s):
     # Calculate total coursework marks from 3 components
     return s["c1"] + s["c2"] + s["c3"]
 
+def _percentage_of(marks):
+    # Convert raw marks out of 160 into a rounded percentage
+    return round((marks / 160) * 100, 2)
+
 def overall_percentage(s):
     # Calculate overall percentage out of 160 (60 coursework + 100 exam)
-    return round(((total_coursework(s) + s["exam"]) / 160) * 100, 2)
+    return _percentage_of(total_coursework(s) + s["exam"])
 
 def grade(p):
     # Return grade based on percentage boundaries
@@ -51,6 +1073,1096 @@ def grade(p):
     if p >= 40: return "D"
     return "F"
 
+MARK_LIMITS = (("c1", 20), ("c2", 20), ("c3", 20), ("exam", 100))  # Highest allowed mark per component
+
+def marks_error(c1, c2, c3, exam):
+    # Return why a set of marks is out of range, or None if they are all valid
+    for (field, limit), mark in zip(MARK_LIMITS, (c1, c2, c3, exam)):
+        if not 0 <= mark <= limit:
+            return f"{field} must be between 0 and {limit}, got {mark}"
+    return None
+
+# ---------------- CHANGE JOURNAL ----------------
+class StudentJournal:
+    # Append-only log of edits kept beside studentMarks.txt, one record per line:
+    #   A,code,name,c1,c2,c3,exam   add        U,code,name,c1,c2,c3,exam   update
+    #   D,code                      delete     S,asc|desc                  sort by percentage
+    # load_students() replays it over the base file, and compact_snapshot() folds it
+    # back into the base file and its binary snapshot (run on the I/O worker by TextFileStorage).
+
+    def __init__(self, path=JOURNAL_PATH, base_path=FILE_PATH, compact_every=COMPACT_EVERY,
+                 snapshot_path=SNAPSHOT_PATH):
+        self.path = path
+        self.old_path = path + ".old"  # Records currently being folded into the base file
+        self.base_path = base_path
+        self.snapshot_path = snapshot_path  # Rewritten with the base file so it stays fresh
+        self.compact_every = compact_every
+        self.records = 0               # Records in the live journal
+        self.lock = threading.Lock()   # Guards the journal files against the compactor
+
+    # ---- Writing ----
+    @staticmethod
+    def record_line(op, value):
+        # Format one edit ("add", "update", "delete" or "sort") as a journal line
+        if op in ("add", "update"):
+            fields = ("A" if op == "add" else "U", value["code"], value["name"],
+                      value["c1"], value["c2"], value["c3"], value["exam"])
+        elif op == "delete":
+            fields = ("D", value)
+        elif op == "sort":
+            fields = ("S", "desc" if value else "asc")
+        else:
+            raise ValueError(f"unknown journal operation {op!r}")
+        return ",".join(map(str, fields)) + "\n"
+
+    @timed("journal_append")
+    def append_lines(self, lines):
+        # Append formatted records in one write; a crash can only tear the last line
+        with self.lock:
+            with open(self.path, "a") as f:
+                f.write("".join(lines))
+
+    # ---- Replay ----
+    @timed("journal_replay")
+    def replay(self, students, read_only=False):
+        # Apply journal records to a store freshly loaded from the base file
+        if os.path.exists(self.old_path):
+            # A compaction was interrupted. If the base file was replaced after the old
+            # journal was last written, its records are already in the base file.
+            if os.path.exists(self.base_path) and \
+                    os.path.getmtime(self.base_path) >= os.path.getmtime(self.old_path):
+                if not read_only:
+                    os.remove(self.old_path)
+            else:
+                self._replay_file(self.old_path, students)
+        self.records = self._replay_file(self.path, students)
+
+    def _replay_file(self, path, students):
+        # Replay one journal file, returning the number of records read
+        if not os.path.exists(path):
+            return 0
+        count = 0
+        with open(path, "r") as f:
+            for line in f:
+                if not line.endswith("\n"):  # Torn final write, never completed
+                    print(f"[⚠️] Ignored incomplete journal record: {line!r}")
+                    break
+                try:
+                    self._apply(students, line.rstrip("\n").split(","))
+                except (ValueError, IndexError, OverflowError) as e:
+                    print(f"[⚠️] Skipped journal record {line.strip()!r}: {e}")
+                count += 1
+        return count
+
+    @staticmethod
+    def _apply(students, parts):
+        # Apply one parsed record to the store
+        op = parts[0]
+        if op in ("A", "U"):
+            s = {"code": int(parts[1]), "name": parts[2], "c1": int(parts[3]),
+                 "c2": int(parts[4]), "c3": int(parts[5]), "exam": int(parts[6])}
+            i = students.find(s["code"])
+            if i < 0:
+                students.append(s)
+            else:
+                students.update(i, s)
+        elif op == "D":
+            i = students.find(int(parts[1]))
+            if i >= 0:
+                students.delete(i)
+        elif op == "S":
+            students.sort_by(students.percentages(), reverse=(parts[1] == "desc"))
+        else:
+            raise ValueError(f"unknown record type {op!r}")
+
+    # ---- Compaction ----
+    @timed("journal_compact")
+    def compact_snapshot(self, snapshot):
+        # Fold the journal into the base file. snapshot must include every record
+        # appended to the journal so far and nothing later.
+        self._rotate()
+        self._write_base(snapshot)
+
+    def _rotate(self):
+        # Move the live journal aside so new edits start a fresh file
+        with self.lock:
+            if not os.path.exists(self.path):
+                return
+            if os.path.exists(self.old_path):
+                # Earlier compaction failed: keep its records until the base file is written
+                with open(self.old_path, "a") as dst, open(self.path, "r") as src:
+                    dst.write(src.read())
+                os.remove(self.path)
+            else:
+                os.replace(self.path, self.old_path)
+
+    def _write_base(self, snapshot):
+        # Atomically replace the base file, then drop the folded records. The binary
+        # snapshot is rewritten from the same copy, or the next startup would find it
+        # older than the base file and fall back to parsing the text.
+        try:
+            save_students(snapshot, self.base_path)
+            with self.lock:
+                if os.path.exists(self.old_path):
+                    os.remove(self.old_path)
+        except OSError as e:
+            print(f"[⚠️] Journal compaction failed: {e}")
+            return
+        if USE_SNAPSHOT:
+            try:
+                save_snapshot(snapshot, self.snapshot_path)
+            except OSError as e:
+                print(f"[⚠️] Could not write snapshot: {e}")
+
+JOURNAL = StudentJournal()
+
+# ---------------- STORAGE BACKENDS ----------------
+class StudentStorage:
+    # Where student records live. Backends implement load() and prepare_write();
+    # query_rows() falls back to a full load and is overridden by backends that
+    # can answer it directly.
+    name = None
+    local = True  # Writes the data files itself, so only one process may use it at a time (DataFileLock)
+
+    def __init__(self, read_only=False):
+        self.read_only = read_only  # Only read: no snapshots, migrations or manifests are written
+
+    def load(self, on_progress=None):
+        # Return every record as a StudentStore
+        raise NotImplementedError
+
+    def write_target(self, students):
+        # Where edits to students are saved, captured when an edit is queued (the cohort
+        # for the "cohorts" backend; None where there is only one place)
+        return None
+
+    def prepare_write(self, changes, students, target=None):
+        # Called on the Tk thread with a list of (op, value) edits already applied to
+        # students and the write_target() taken when they were made. Returns a function
+        # that persists them, safe to run on the I/O worker.
+        raise NotImplementedError
+
+    def write(self, changes, students):
+        # Persist edits straight away on the calling thread
+        self.prepare_write(changes, students, self.write_target(students))()
+
+    def query_rows(self, keys=(), grades=None, min_pct=None, max_pct=None, limit=None):
+        # Report rows as report_rows() gives them for the loaded store. The records are
+        # read before this returns, so load warnings come out where the caller expects.
+        return report_rows(self.load(), keys, grades, min_pct, max_pct, limit)
+
+    def close(self):
+        pass
+
+class TextFileStorage(StudentStorage):
+    # studentMarks.txt, with the change journal and binary snapshot in front of it
+    name = "text"
+
+    def load(self, on_progress=None):
+        return load_students(on_progress, self.read_only)
+
+    def prepare_write(self, changes, students, target=None):
+        if not JOURNAL_MODE:
+            snapshot = students.copy()  # One full rewrite covers every queued edit
+            return lambda: save_students(snapshot)
+        lines = []
+        for op, value in changes:
+            if op == "import":  # value is a StudentStore of the imported rows
+                lines.extend(JOURNAL.record_line("add", s) for s in value)
+            else:
+                lines.append(JOURNAL.record_line(op, value))
+        JOURNAL.records += len(lines)
+        snapshot = None
+        if JOURNAL.records >= JOURNAL.compact_every:
+            # Taken now so it matches exactly the journal records it replaces
+            JOURNAL.records = 0
+            snapshot = students.copy()
+
+        def write():
+            JOURNAL.append_lines(lines)
+            if snapshot is not None:
+                JOURNAL.compact_snapshot(snapshot)
+        return write
+
+class SQLiteStorage(StudentStorage):
+    # Stdlib sqlite3 backend: indexed by code and percentage, every batch of edits
+    # written in one transaction, and report filters, sorts and limits answered by SQL.
+    # "position" keeps the display order in step with the in-memory store.
+    name = "sqlite"
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS students (
+            code INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            c1 INTEGER NOT NULL,
+            c2 INTEGER NOT NULL,
+            c3 INTEGER NOT NULL,
+            exam INTEGER NOT NULL,
+            percentage REAL NOT NULL,
+            position INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS students_percentage ON students (percentage);
+        CREATE INDEX IF NOT EXISTS students_position ON students (position);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+    """
+    FIELDS = "code, name, c1, c2, c3, exam"
+    # SQL for each of StudentStore.SORT_FIELDS, ordering rows the same way as sort_key()
+    SORT_COLUMNS = {"name": "name COLLATE casefold", "code": "code", "exam": "exam",
+                    "coursework": "c1 + c2 + c3", "percentage": "percentage"}
+
+    def __init__(self, path=None, read_only=False):
+        super().__init__(read_only)
+        self.path = path or DB_PATH
+        self.lock = threading.Lock()
+        if read_only:
+            # Never create or migrate the database; until it exists the text file is read instead
+            self.conn = None
+            if os.path.exists(self.path):
+                self.conn = sqlite3.connect(f"file:{urllib.request.pathname2url(self.path)}?mode=ro",
+                                            uri=True, check_same_thread=False)
+                self._add_functions()
+            return
+        # Shared between the Tk thread and the I/O worker, so access is serialised by the lock
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._add_functions()
+        with self.lock, self.conn:
+            self.conn.executescript(self.SCHEMA)
+
+    def _add_functions(self):
+        # The grade letter and casefolded name order used by the in-memory store
+        self.conn.create_function("grade", 1, grade, deterministic=True)
+        self.conn.create_collation(
+            "casefold", lambda a, b: (a.casefold() > b.casefold()) - (a.casefold() < b.casefold()))
+
+    def _migrated(self):
+        if self.conn is None:
+            return False
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'migrated_from'").fetchone()
+        return row is not None
+
+    @timed("sqlite_migrate")
+    def migrate_from_text(self, on_progress=None):
+        # One-shot import of studentMarks.txt (plus any pending journal edits)
+        students = load_students(on_progress)
+        pcts = students.percentages()
+        rows = ((s["code"], s["name"], s["c1"], s["c2"], s["c3"], s["exam"], pcts[i], i)
+                for i, s in enumerate(students))
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM students")
+            self.conn.executemany(f"INSERT INTO students ({self.FIELDS}, percentage, position) "
+                                  "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('migrated_from', ?)", (FILE_PATH,))
+        print(f"[ℹ️] Imported {len(students)} students from {FILE_PATH} into {self.path}")
+
+    def load(self, on_progress=None):
+        if not self._migrated():
+            if self.read_only:
+                return load_students(on_progress, read_only=True)
+            self.migrate_from_text()
+        students = StudentStore()
+        with self.lock:
+            total = self.conn.execute("SELECT COUNT(*) FROM students").fetchone()[0]
+            cur = self.conn.execute(f"SELECT {self.FIELDS} FROM students ORDER BY position")
+            while True:
+                rows = cur.fetchmany(CHUNK_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    students.add_row(*row)
+                if on_progress:
+                    on_progress(len(students), total)
+        return students
+
+    def prepare_write(self, changes, students, target=None):
+        changes = list(changes)  # Values are already independent dicts/ints
+        return lambda: self.apply_changes(changes)
+
+    @timed("sqlite_write")
+    def apply_changes(self, changes):
+        # Apply a batch of edits in a single transaction
+        with self.lock, self.conn:
+            for op, value in changes:
+                if op == "add":
+                    self.conn.execute(
+                        f"INSERT INTO students ({self.FIELDS}, percentage, position) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, (SELECT COALESCE(MAX(position) + 1, 0) FROM students))",
+                        (value["code"], value["name"], value["c1"], value["c2"], value["c3"],
+                         value["exam"], overall_percentage(value)))
+                elif op == "update":
+                    self.conn.execute(
+                        "UPDATE students SET name = ?, c1 = ?, c2 = ?, c3 = ?, exam = ?, percentage = ? "
+                        "WHERE code = ?",
+                        (value["name"], value["c1"], value["c2"], value["c3"], value["exam"],
+                         overall_percentage(value), value["code"]))
+                elif op == "delete":
+                    row = self.conn.execute("SELECT position FROM students WHERE code = ?", (value,)).fetchone()
+                    if row is None:
+                        continue
+                    self.conn.execute("DELETE FROM students WHERE code = ?", (value,))
+                    # Same swap-remove as StudentStore.delete: the last row takes the freed position
+                    self.conn.execute("UPDATE students SET position = ? WHERE position = "
+                                      "(SELECT MAX(position) FROM students) AND position > ?", (row[0], row[0]))
+                elif op == "import":
+                    # value is a StudentStore of new rows, appended after the current last position
+                    start = self.conn.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM students").fetchone()[0]
+                    pcts = value.percentages()
+                    self.conn.executemany(
+                        f"INSERT INTO students ({self.FIELDS}, percentage, position) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        ((s["code"], s["name"], s["c1"], s["c2"], s["c3"], s["exam"], pcts[i], start + i)
+                         for i, s in enumerate(value)))
+                elif op == "sort":
+                    # Stable sort like the in-memory one: ties keep their current order
+                    direction = "DESC" if value else "ASC"
+                    self.conn.execute(
+                        "UPDATE students SET position = ranked.r FROM ("
+                        f"SELECT code, ROW_NUMBER() OVER (ORDER BY percentage {direction}, position) - 1 AS r "
+                        "FROM students) AS ranked WHERE students.code = ranked.code")
+                else:
+                    raise ValueError(f"unknown operation {op!r}")
+
+    def query_rows(self, keys=(), grades=None, min_pct=None, max_pct=None, limit=None):
+        # Filter, sort and limit in SQL (the percentage index serves the common cases),
+        # so only the rows being reported are read. Ties keep stored order, as in report_rows().
+        if not self._migrated():
+            if self.read_only:
+                return super().query_rows(keys, grades, min_pct, max_pct, limit)
+            self.migrate_from_text()
+        where, params = [], []
+        if grades:
+            where.append(f"grade(percentage) IN ({', '.join('?' * len(grades))})")
+            params.extend(grades)
+        if min_pct is not None:
+            where.append("percentage >= ?")
+            params.append(min_pct)
+        if max_pct is not None:
+            where.append("percentage <= ?")
+            params.append(max_pct)
+        order = [f"{self.SORT_COLUMNS[field]} {'DESC' if descending else 'ASC'}" for field, descending in keys]
+        sql = f"SELECT {self.FIELDS}, percentage FROM students"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY " + ", ".join(order + ["position"])
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(max(limit, 0))
+        with self.lock:
+            cur = self.conn.execute(sql, params)
+        return self._report_rows(cur)
+
+    def _report_rows(self, cur):
+        # Stream a query_rows() cursor as report rows, a chunk at a time
+        while True:
+            with self.lock:
+                rows = cur.fetchmany(CHUNK_SIZE)
+            if not rows:
+                return
+            for code, name, c1, c2, c3, exam, pct in rows:
+                yield {"code": code, "name": name, "c1": c1, "c2": c2, "c3": c3, "exam": exam,
+                       "coursework": c1 + c2 + c3, "percentage": pct, "grade": grade(pct)}
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+
+class StudentConflict(Exception):
+    # Raised when the student service rejects an edit because another client changed the record first
+    pass
+
+class ServiceStorage(StudentStorage):
+    # Records owned by student_service.py, reached over loopback HTTP/JSON. The service
+    # keeps a version number per record; edits carry the version this client last saw,
+    # and a record changed by someone else in the meantime is refused with StudentConflict.
+    name = "service"
+    local = False
+
+    def __init__(self, url=None, read_only=False):
+        super().__init__(read_only)
+        self.url = (url or SERVICE_URL).rstrip("/")
+        self.versions = {}  # code -> version last seen; only used on the I/O worker
+
+    def _request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.url + path, data=data, method=method,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            return urllib.request.urlopen(request, timeout=SERVICE_TIMEOUT)
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get("error", e.reason)
+            except ValueError:
+                message = e.reason
+            if e.code == 409:
+                raise StudentConflict(message) from None
+            raise OSError(f"Student service error {e.code}: {message}") from None
+
+    def load(self, on_progress=None):
+        # Stream every record as JSON Lines of [code, name, c1, c2, c3, exam, version]
+        students = StudentStore()
+        versions = {}
+        with self._request("GET", "/students") as response:
+            total = int(response.headers.get("X-Student-Count", 0))
+            for line in response:
+                code, name, c1, c2, c3, exam, version = json.loads(line)
+                students.add_row(code, name, c1, c2, c3, exam)
+                versions[code] = version
+                if on_progress and len(students) % CHUNK_SIZE == 0:
+                    on_progress(len(students), total)
+        self.versions = versions
+        if on_progress:
+            on_progress(total, total)
+        return students
+
+    def prepare_write(self, changes, students, target=None):
+        batch = []
+        for op, value in changes:
+            if op == "import":  # value is a StudentStore of new rows
+                batch.extend({"op": "add", "value": s} for s in value)
+            else:
+                batch.append({"op": op, "value": value})
+        return lambda: self.send_changes(batch)
+
+    @timed("service_write")
+    def send_changes(self, batch):
+        # Send a batch of edits; the service applies all of them or none
+        seen = set()
+        for change in batch:
+            code = change["value"] if change["op"] == "delete" else \
+                change["value"].get("code") if isinstance(change["value"], dict) else None
+            # Only the first edit of a record in the batch is checked; later ones build on it
+            if code is not None and code not in seen and code in self.versions:
+                change["version"] = self.versions[code]
+            seen.add(code)
+        with self._request("POST", "/changes", {"changes": batch}) as response:
+            result = json.load(response)
+        for code, version in result["versions"]:
+            if version is None:
+                self.versions.pop(code, None)
+            else:
+                self.versions[code] = version
+
+class CohortShards:
+    # A folder of cohort files (one studentMarks-style file per module and year, e.g.
+    # cohorts/CS101-2025.txt) plus cohorts.json, a manifest of each file's student count
+    # and percentage range. Cohorts are loaded when first opened and dropped again once
+    # they have been idle for idle_seconds; the manifest answers everything else.
+    MANIFEST = "cohorts.json"
+    MANIFEST_VERSION = 1
+
+    def __init__(self, folder=None, idle_seconds=COHORT_IDLE_SECONDS, read_only=False):
+        self.folder = folder or COHORTS_DIR
+        self.idle_seconds = idle_seconds
+        self.read_only = read_only  # Keep the manifest and snapshots in memory only
+        self.lock = threading.RLock()  # Used from the Tk thread and the I/O worker
+        self.loaded = {}    # cohort -> [StudentStore, time.monotonic() of last use]
+        self.pinned = None  # Cohort never dropped, e.g. the one the GUI is editing
+        self.manifest = self._read_manifest()  # cohort -> {"count", "min_percentage", "max_percentage", "stamp"}
+
+    def path(self, name, ext=".txt"):
+        if not name or os.path.basename(name) != name or name.startswith("."):
+            raise ValueError(f"Invalid cohort name {name!r}")
+        return os.path.join(self.folder, name + ext)
+
+    def names(self):
+        with self.lock:
+            return sorted(self.manifest)
+
+    def _read_manifest(self):
+        try:
+            with open(os.path.join(self.folder, self.MANIFEST)) as f:
+                manifest = json.load(f)
+            if manifest.get("version") == self.MANIFEST_VERSION:
+                return manifest["cohorts"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass  # Missing or unreadable: refresh() rebuilds it
+        return {}
+
+    def _write_manifest(self):
+        with atomic_open(os.path.join(self.folder, self.MANIFEST)) as f:
+            json.dump({"version": self.MANIFEST_VERSION, "cohorts": self.manifest}, f, indent=1, sort_keys=True)
+
+    @staticmethod
+    def _stamp(path):
+        # Changes whenever the file is rewritten, by us or anyone else
+        st = os.stat(path)
+        return [st.st_mtime_ns, st.st_size]
+
+    def _summarise(self, name, students):
+        pcts = students.percentages()
+        self.manifest[name] = {"count": len(students), "min_percentage": min(pcts, default=None),
+                               "max_percentage": max(pcts, default=None), "stamp": self._stamp(self.path(name))}
+
+    @timed("cohort_refresh")
+    def refresh(self):
+        # Bring the manifest up to date with the folder. Only cohorts that are new or
+        # changed since the manifest was written are read, and they are not kept loaded.
+        with self.lock:
+            if not self.read_only:
+                os.makedirs(self.folder, exist_ok=True)
+            files = os.listdir(self.folder) if os.path.isdir(self.folder) else []
+            names = {f[:-4] for f in files if f.endswith(".txt") and not f.startswith(".")}
+            changed = False
+            for name in set(self.manifest) - names:
+                del self.manifest[name]
+                changed = True
+            for name in sorted(names):
+                entry = self.manifest.get(name)
+                if entry is None or entry["stamp"] != self._stamp(self.path(name)):
+                    self.loaded.pop(name, None)
+                    self._summarise(name, self._load(name))
+                    changed = True
+            if changed and not self.read_only:
+                self._write_manifest()
+
+    @timed("cohort_load")
+    def _load(self, name):
+        # Read one cohort, from its binary snapshot when that is up to date
+        path, snapshot = self.path(name), self.path(name, ".bin")
+        students = None
+        if USE_SNAPSHOT and snapshot_is_fresh(snapshot, path):
+            students = load_snapshot(snapshot)
+        if students is None:
+            students = load_students_text(path=path)
+            if USE_SNAPSHOT and not self.read_only and os.path.exists(path) and not students.load_errors:
+                try:
+                    save_snapshot(students, snapshot)
+                except OSError as e:
+                    print(f"[⚠️] Could not write snapshot for cohort {name}: {e}")
+        students.cohort = name
+        return students
+
+    def open(self, name):
+        # The cohort's StudentStore, loaded on first use (an unknown name is a new, empty cohort)
+        with self.lock:
+            entry = self.loaded.get(name)
+            if entry is None:
+                entry = self.loaded[name] = [self._load(name), 0.0]
+            entry[1] = time.monotonic()
+            self.evict_idle()
+            return entry[0]
+
+    def evict_idle(self):
+        # Drop cohorts not opened for idle_seconds; the next open() reads them again
+        cutoff = time.monotonic() - self.idle_seconds
+        with self.lock:
+            for name in [name for name, (students, used) in self.loaded.items()
+                         if used < cutoff and name != self.pinned]:
+                del self.loaded[name]
+
+    @timed("cohort_save")
+    def save(self, name, students):
+        # Rewrite one cohort's file and manifest entry from students (a private copy)
+        with self.lock:
+            os.makedirs(self.folder, exist_ok=True)
+            save_students(students, self.path(name))
+            self._summarise(name, students)
+            self._write_manifest()
+            if name in self.loaded and name != self.pinned:
+                self.loaded[name][0] = students  # The cached copy predates these edits
+            self.evict_idle()
+
+    def top(self, n, lowest=False):
+        # The n highest (or lowest) scoring students across all cohorts as (cohort, row)
+        # pairs, best (or worst) first. Cohorts are visited in order of their manifest
+        # maximum (or minimum) and the rest are skipped, unread, once none can place.
+        if n <= 0:
+            return []
+        bound = "min_percentage" if lowest else "max_percentage"
+        found = []  # (percentage, cohort, row)
+        with self.lock:
+            names = sorted((name for name, entry in self.manifest.items() if entry["count"]),
+                           key=lambda name: self.manifest[name][bound], reverse=not lowest)
+            for name in names:
+                edge = self.manifest[name][bound]
+                if len(found) >= n and (edge >= found[-1][0] if lowest else edge <= found[-1][0]):
+                    break
+                students = self.open(name)
+                rows = students.bottom(n) if lowest else students.top(n)
+                found.extend((overall_percentage(s), name, s) for s in rows)
+                found.sort(key=lambda item: item[0], reverse=not lowest)
+                del found[n:]
+        return [(name, s) for pct, name, s in found]
+
+class ShardedStorage(StudentStorage):
+    # "cohorts" backend: the GUI and the reports work on one cohort of COHORTS_DIR at a
+    # time, while the cohorts command looks across every cohort (see CohortShards)
+    name = "cohorts"
+
+    def __init__(self, folder=None, cohort=None, read_only=False):
+        super().__init__(read_only)
+        self.shards = CohortShards(folder, read_only=read_only)
+        self.cohort = cohort or COHORT  # "" until load() picks the first cohort
+
+    def cohorts(self):
+        return self.shards.names()
+
+    def load(self, on_progress=None):
+        self.shards.refresh()
+        if not self.cohort:
+            self.cohort = next(iter(self.shards.names()), "default")
+        self.shards.pinned = self.cohort
+        students = self.shards.open(self.cohort)
+        if on_progress:
+            on_progress(1, 1)
+        return students
+
+    def write_target(self, students):
+        return self.cohort  # The cohort open when the edit was made
+
+    def prepare_write(self, changes, students, target=None):
+        # Edits always go back to the cohort that was open when they were made, even if
+        # another cohort has been opened since they were queued
+        name = target or self.cohort
+        snapshot = students.copy()  # One rewrite of the (small) cohort file covers every queued edit
+        return lambda: self.shards.save(name, snapshot)
+
+STORAGE_BACKENDS = {"text": TextFileStorage, "sqlite": SQLiteStorage, "service": ServiceStorage,
+                    "cohorts": ShardedStorage}
+
+def storage_class(backend=None):
+    # The StudentStorage subclass named by STORAGE_BACKEND (or the given name)
+    backend = backend or STORAGE_BACKEND
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend {backend!r}, expected one of {', '.join(STORAGE_BACKENDS)}")
+    return STORAGE_BACKENDS[backend]
+
+def open_storage(backend=None, read_only=False):
+    # Create the storage backend named by STORAGE_BACKEND (or the given name). A read_only
+    # backend leaves every file as it found it, e.g. for the command-line reports.
+    return storage_class(backend)(read_only=read_only)
+
+# ---------------- BULK IMPORT ----------------
+class ImportResult:
+    # Outcome of a bulk import: the accepted rows as their own StudentStore and the
+    # rejected ones as (file, line_number, line, reason)
+    def __init__(self):
+        self.files = []
+        self.rows = StudentStore()
+        self.rejected = []
+
+    def write_report(self, path=None):
+        # Save every rejected row to a text report
+        with atomic_open(path or IMPORT_REPORT_PATH) as f:
+            f.write(f"Imported {len(self.rows)} student(s) from {len(self.files)} file(s), "
+                    f"rejected {len(self.rejected)} row(s)\n")
+            for file, line_no, line, reason in self.rejected:
+                f.write(f"{os.path.basename(file)}:{line_no}: {reason}: {line}\n")
+
+    def discard_existing(self, students):
+        # Reject rows whose code reached students after the import started
+        for code in [code for code in self.rows.code if code in students]:
+            i = self.rows.find(code)
+            s = self.rows.row(i)
+            line = f"{code},{s['name']},{s['c1']},{s['c2']},{s['c3']},{s['exam']}"
+            self.rejected.append(("", 0, line, f"duplicate student code {code}"))
+            self.rows.delete(i)
+
+def _csv_ranges(path, chunk_bytes):
+    # Split a file into (start, end) byte ranges that begin and end on line boundaries
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, "rb") as f:
+        start = 0
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()  # Run on to the end of the line the cut landed in
+            end = f.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+def parse_import_range(path, start, end):
+    # Parse and validate one byte range of a "code,name,c1,c2,c3,exam" CSV file.
+    # Runs in an import worker process, so it returns compact columns rather than dicts:
+    # (codes, names, [c1, c2, c3, exam], line numbers, rejected, lines in range), with
+    # line numbers relative to the start of the range.
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    text = data.decode("utf-8-sig" if start == 0 else "utf-8", errors="replace")
+    codes, names, line_nos, rejected = array("i"), [], array("i"), []
+    marks = [array("h") for _ in MARK_LIMITS]
+    add_c1, add_c2, add_c3, add_exam = (col.append for col in marks)
+    max_c1, max_c2, max_c3, max_exam = (limit for _, limit in MARK_LIMITS)
+    for line_no, line in enumerate(text.split("\n"), 1):
+        if not line.strip():
+            continue
+        # Only quoted lines need the csv module; plain ones split much faster
+        row = next(csv.reader([line])) if '"' in line else line.split(",")
+        try:
+            if len(row) != 6:
+                raise ValueError(f"expected 6 fields, found {len(row)}")
+            code, name = int(row[0]), row[1].strip()
+            c1, c2, c3, exam = map(int, row[2:])
+        except ValueError as e:
+            if start == 0 and line_no == 1:
+                continue  # Header row (or the record count line of a studentMarks.txt file)
+            rejected.append((line_no, line.strip(), str(e)))
+            continue
+        if (0 <= c1 <= max_c1 and 0 <= c2 <= max_c2 and 0 <= c3 <= max_c3 and 0 <= exam <= max_exam
+                and 0 < code < 2 ** 31 and name and "," not in name):
+            codes.append(code)
+            names.append(name)
+            add_c1(c1)
+            add_c2(c2)
+            add_c3(c3)
+            add_exam(exam)
+            line_nos.append(line_no)
+            continue
+        if name == "":
+            reason = "name is empty"
+        elif "," in name:
+            reason = "name contains a comma"
+        elif not 0 < code < 2 ** 31:
+            reason = f"student code {code} out of range"
+        else:
+            reason = marks_error(c1, c2, c3, exam)
+        rejected.append((line_no, line.strip(), reason))
+    return codes, names, marks, line_nos, rejected, data.count(b"\n")
+
+@timed("import_csv_files")
+def import_csv_files(paths, existing=(), workers=IMPORT_WORKERS, chunk_bytes=IMPORT_CHUNK_BYTES):
+    # Parse CSV files in a process pool and collect the valid, new rows into an ImportResult.
+    # Codes already in existing, or repeated within the import, are rejected as duplicates
+    # (the first occurrence wins, as when loading studentMarks.txt).
+    result = ImportResult()
+    paths = result.files = list(dict.fromkeys(paths))  # Empty files count as imported too
+    tasks = [(path, start, end) for path in paths for start, end in _csv_ranges(path, chunk_bytes)]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            parsed = list(pool.map(parse_import_range, *zip(*tasks)))
+    else:
+        parsed = [parse_import_range(*task) for task in tasks]
+
+    # Merge the parsed ranges into ready-made columns (one add_row per row would be far slower)
+    all_codes, all_name_ids, all_marks = array("i"), array("i"), [array("h") for _ in range(4)]
+    name_ids = {}     # name -> position in the name table
+    seen = set()      # codes accepted so far
+    first_line = dict.fromkeys(paths, 0)  # path -> line number at which the current range starts
+    for (path, start, end), (codes, names, marks, line_nos, rejected, lines) in zip(tasks, parsed):
+        base = first_line[path]
+        first_line[path] += lines
+        result.rejected.extend((path, base + n, line, reason) for n, line, reason in rejected)
+        keep = []
+        for j, code in enumerate(codes):
+            if code in seen or code in existing:
+                line = f"{code},{names[j]}," + ",".join(str(col[j]) for col in marks)
+                result.rejected.append((path, base + line_nos[j], line, f"duplicate student code {code}"))
+            else:
+                seen.add(code)
+                keep.append(j)
+        all_codes.extend(map(codes.__getitem__, keep))
+        all_name_ids.extend(name_ids.setdefault(names[j], len(name_ids)) for j in keep)
+        for col, parsed_col in zip(all_marks, marks):
+            col.extend(map(parsed_col.__getitem__, keep))
+    result.rows = StudentStore.from_columns(all_codes, all_name_ids, *all_marks, list(name_ids))
+    order = {path: i for i, path in enumerate(result.files)}
+    result.rejected.sort(key=lambda r: (order[r[0]], r[1]))
+    return result
+
+# ---------------- EXPORT ----------------
+# Report cards carry what a student box shows: coursework total, exam, percentage and grade.
+# Rows stream in from report_rows() and are handed to a process pool in batches; each
+# worker renders and writes its batch of cards. Only a couple of batches per worker are
+# in flight at a time, so memory stays flat whatever the size of the cohort.
+CARD_FORMATS = {"html": ".html", "text": ".txt"}  # Report card format -> file extension
+
+REPORT_CARD_TEXT = """\
+Bath Spa University - Student Report Card
+=========================================
+Name:             {name}
+Student #:        {code}
+Coursework 1-3:   {c1}/20, {c2}/20, {c3}/20
+Coursework Total: {coursework}/60
+Exam:             {exam}/100
+Percentage:       {percentage}%
+Grade:            {grade}
+"""
+
+REPORT_CARD_HTML = """\
+<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="utf-8"><title>Report Card - {name}</title>
+<style>
+body {{ font-family: Arial, sans-serif; background: #ecf0f1; }}
+.card {{ width: 280px; margin: 40px auto; padding: 16px; background: white; border: 2px groove #bdc3c7; text-align: center; }}
+h1 {{ font-size: 14px; color: #2c3e50; }}
+.name {{ font-size: 16px; font-weight: bold; color: #2980b9; }}
+.grade {{ font-weight: bold; }}
+</style></head>
+<body><div class="card">
+<h1>Bath Spa University - Student Report Card</h1>
+<p class="name">Name: {name}</p>
+<p>Student #: {code}</p>
+<p>Coursework Total: {coursework}/60</p>
+<p>Exam: {exam}/100</p>
+<p>Percentage: {percentage}%</p>
+<p class="grade">Grade: {grade}</p>
+</div></body>
+</html>
+"""
+
+def render_report_card(s, fmt="html"):
+    # One student's report card from a report_rows() row
+    if fmt == "html":
+        return REPORT_CARD_HTML.format_map(dict(s, name=html.escape(s["name"])))
+    return REPORT_CARD_TEXT.format_map(s)
+
+def write_report_cards(rows, folder, fmt):
+    # Render a batch of rows into folder as <code>.html / <code>.txt and return the bytes
+    # written. Runs in an export worker process.
+    ext = CARD_FORMATS[fmt]
+    written = 0
+    for s in rows:
+        card = render_report_card(s, fmt).encode("utf-8")
+        with open(os.path.join(folder, f"{s['code']}{ext}"), "wb") as f:
+            f.write(card)
+        written += len(card)
+    return written
+
+class ExportResult:
+    # Size and speed of one export, for the throughput report
+    def __init__(self, path):
+        self.path = path
+        self.records = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def __str__(self):
+        rate = self.records / self.seconds if self.seconds else 0
+        mb_rate = self.bytes / 2 ** 20 / self.seconds if self.seconds else 0
+        return (f"Exported {self.records} record(s) to {self.path} in {self.seconds:.2f}s "
+                f"({rate:,.0f} records/s, {mb_rate:.1f} MB/s)")
+
+def _batches(rows, size):
+    # Group a stream of rows into lists of up to size rows
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+@timed("export_report_cards")
+def export_report_cards(rows, folder, fmt="html", workers=EXPORT_WORKERS, batch_size=EXPORT_BATCH):
+    # Write one report card per row into folder, rendering batches in parallel processes
+    result = ExportResult(folder)
+    start = time.perf_counter()
+    os.makedirs(folder, exist_ok=True)
+
+    def done(batch, written):
+        result.records += len(batch)
+        result.bytes += written
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            in_flight = deque()  # (batch, future), oldest first
+            for batch in _batches(rows, batch_size):
+                in_flight.append((batch, pool.submit(write_report_cards, batch, folder, fmt)))
+                if len(in_flight) >= 2 * workers:  # Don't read ahead of the workers
+                    batch, future = in_flight.popleft()
+                    done(batch, future.result())
+            for batch, future in in_flight:
+                done(batch, future.result())
+    else:
+        for batch in _batches(rows, batch_size):
+            done(batch, write_report_cards(batch, folder, fmt))
+    result.seconds = time.perf_counter() - start
+    return result
+
+@timed("export_records")
+def export_records(rows, path, fmt="csv"):
+    # Stream rows into one CSV or JSON Lines file (written atomically, like studentMarks.txt)
+    result = ExportResult(path)
+    start = time.perf_counter()
+
+    def counted():
+        for row in rows:
+            result.records += 1
+            yield row
+
+    with atomic_open(path) as f:
+        write_records(counted(), fmt, REPORT_FIELDS, f)
+    result.bytes = os.path.getsize(path)
+    result.seconds = time.perf_counter() - start
+    return result
+
+# ---------------- DATA FILE LOCK ----------------
+class DataFileLock:
+    # Exclusive advisory lock on studentMarks.lock, taken by whichever process writes the
+    # records (a GUI on a local backend, or student_service.py), so two writers can never
+    # overwrite each other's saves. Readers such as the report CLI do not need it.
+    def __init__(self, path=None):
+        self.path = path or LOCK_PATH
+        self.file = None
+
+    def acquire(self):
+        # Take the lock without waiting; returns False if another process holds it
+        f = open(self.path, "a+")
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            f.close()
+            return False
+        self.file = f
+        return True
+
+    def release(self):
+        if self.file is not None:
+            self.file.close()  # Closing the file drops the lock
+            self.file = None
+
+# ---------------- BACKGROUND I/O ----------------
+class BackgroundStoreIO:
+    # Runs store I/O on a single worker thread so the Tk mainloop never waits on disk.
+    # Results come back to the Tk thread by polling the futures with root.after, and
+    # edits made in quick succession are coalesced into a single write.
+    POLL_MS = 50
+
+    def __init__(self, root, storage, on_status=None, on_conflict=None):
+        self.root = root
+        self.storage = storage
+        self.on_status = on_status or (lambda text: None)  # Shows "Saving…" etc. in the UI
+        self.on_conflict = on_conflict  # Called when a save loses to another client's edit
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="store-io")
+        self.students = None      # Store the pending edits were made to
+        self.target = None        # Its storage.write_target() when they were made
+        self.pending = []         # (op, value) edits waiting for the next flush
+        self.flush_id = None      # after() id of the scheduled flush
+        self.in_flight = None     # Future of the write currently running
+
+    def submit(self, fn, *args, on_done=None, on_error=None):
+        # Run fn(*args) on the worker; on_done/on_error are called on the Tk thread
+        future = self.executor.submit(fn, *args)
+        self._watch(future, on_done, on_error)
+        return future
+
+    def _watch(self, future, on_done, on_error):
+        if not future.done():
+            self.root.after(self.POLL_MS, self._watch, future, on_done, on_error)
+            return
+        error = future.exception()
+        if error is not None:
+            if on_error:
+                on_error(error)
+            else:
+                print(f"[⚠️] Background I/O failed: {error}")
+        elif on_done:
+            on_done(future.result())
+
+    def load(self, on_done, on_error=None):
+        # Load the student store off the Tk thread, showing progress while it runs
+        progress = {"fraction": 0.0}  # Written by the worker, read by the Tk thread
+
+        def on_progress(done, total):
+            progress["fraction"] = done / total if total else 1.0
+
+        def done(students):
+            self.on_status("")
+            on_done(students)
+
+        future = self.submit(self.storage.load, on_progress, on_done=done, on_error=on_error)
+
+        def show_progress():
+            if future.done():
+                return
+            self.on_status(f"Loading students… {progress['fraction']:.0%}")
+            self.root.after(200, show_progress)
+        show_progress()
+
+    def record(self, students, op, value):
+        # Queue one edit; the actual write happens in flush() after SAVE_DELAY_MS
+        target = self.storage.write_target(students)
+        if self.pending and (students is not self.students or target != self.target):
+            self._write_pending()  # Edits to another store (e.g. cohort) are a batch of their own
+        self.students, self.target = students, target
+        self.pending.append((op, value))
+        self.on_status("Saving…")
+        if self.flush_id is None:
+            self.flush_id = self.root.after(SAVE_DELAY_MS, self.flush)
+
+    def flush(self):
+        # Hand everything queued so far to the worker as one write
+        self.flush_id = None
+        if self.in_flight is not None and not self.in_flight.done():
+            self.flush_id = self.root.after(SAVE_DELAY_MS, self.flush)  # Let the current write finish
+            return
+        if self.pending:
+            self._write_pending()
+
+    def _write_pending(self):
+        # Hand the queued edits to the worker (which runs writes in order) as one write
+        changes, self.pending = self.pending, []
+        self.in_flight = self.submit(self.storage.prepare_write(changes, self.students, self.target),
+                                     on_done=self._saved, on_error=self._save_failed)
+
+    def _saved(self, result):
+        if self.flush_id is None and not self.pending:
+            self.on_status("")
+
+    def _save_failed(self, error):
+        if isinstance(error, StudentConflict) and self.on_conflict:
+            # Edits queued after the rejected batch were made on the same stale records
+            if self.flush_id is not None:
+                self.root.after_cancel(self.flush_id)
+                self.flush_id = None
+            self.pending = []
+            self.on_status("")
+            messagebox.showwarning("Records Changed",
+                                   f"Your change was not saved: {error}\n\nThe records will be reloaded.")
+            self.on_conflict()
+            return
+        self.on_status("Save failed")
+        messagebox.showerror("Error", f"Could not save student records: {error}")
+
+    def close(self):
+        # Write anything still queued and wait for the worker before the app exits
+        if self.flush_id is not None:
+            self.root.after_cancel(self.flush_id)
+            self.flush_id = None
+        if self.pending:
+            self.executor.submit(self.storage.prepare_write(self.pending, self.students, self.target))
+            self.pending = []
+        self.executor.submit(self.storage.close)
+        self.executor.shutdown(wait=True)
+
+# ---------------- IMAGE CACHE ----------------
+_images = {}  # (path, subsample factor) -> decoded tk.PhotoImage, or None if it could not be loaded
+
+def cached_image(path, subsample=1):
+    # Decode an image file once per process; subsampled variants are cached as well.
+    # Returns None (warning once) if the file cannot be loaded.
+    key = (path, subsample)
+    if key not in _images:
+        try:
+            if subsample == 1:
+                _images[key] = tk.PhotoImage(file=path)
+            else:
+                full = cached_image(path)
+                _images[key] = full.subsample(subsample, subsample) if full else None
+        except (tk.TclError, RuntimeError) as e:
+            print(f"[⚠️] Could not load image {os.path.basename(path)}: {e}")
+            _images[key] = None
+    return _images[key]
+
+def clear_image_cache():
+    # Forget every cached image, once the Tk root they belong to has gone
+    _images.clear()
+
+def maximize(window):
+    # Maximize a window: the "zoomed" state on Windows and macOS, the -zoomed
+    # attribute on X11, which rejects that state
+    try:
+        window.state("zoomed")
+    except tk.TclError:
+        try:
+            window.attributes("-zoomed", True)
+        except tk.TclError:
+            pass  # Leave the window at its default size
+
 # ---------------- GUI APPLICATION ----------------
 class StudentManagerHybrid:
     # Define color constants for the UI
@@ -68,30 +2180,37 @@ class StudentManagerHybrid:
     PURPLE = "#8e44ad"
     PURPLE_HOVER = "#9b59b6"
     BOX_HOVER = "#d1e7ff"
+    SEARCH_LIMIT = 1000  # Most matches listed for one search
+    LEADERBOARD_SIZE = 10  # Students shown by Highest/Lowest Score
+    COHORT_EVICT_MS = 60000  # How often idle cohorts are looked for and dropped
 
     def __init__(self, root):
         # Initialize main window and UI components
         self.root = root
         self.root.title("BSU Student Manager")
-        self.root.state("zoomed")  # Maximize window
+        maximize(self.root)
         self.root.configure(bg=self.BG_LIGHT)
 
         # Try to set main window icon if logo exists
-        try:
-            self.icon_img = tk.PhotoImage(file=LOGO_PATH)
+        self.icon_img = cached_image(LOGO_PATH)
+        if self.icon_img:
             self.root.iconphoto(False, self.icon_img)
-        except:
-            pass
 
-        # Load student records from file
-        self.students = load_students()
+        # Student records are loaded on the I/O worker once the window is up
+        self.students = StudentStore()
+        self.sort_keys = []  # Active sort view as (field, descending) pairs, [] = stored order
+        self.student_grid = None  # VirtualStudentGrid in bottom_frame, if one has been shown
+        # The lock is taken before the backend is opened: a window that doesn't get it opens
+        # the backend read-only, so it never touches files another process is writing
+        self.data_lock = DataFileLock()
+        self.read_only = storage_class().local and not self.data_lock.acquire()
+        self.storage = open_storage(read_only=self.read_only)  # Backend chosen by STORAGE_BACKEND
+        self.store_io = BackgroundStoreIO(root, self.storage, on_status=self.show_status,
+                                          on_conflict=self.reload_students)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # Load person icon for student display boxes
-        try:
-            self.person_img = tk.PhotoImage(file=PERSON_ICON_PATH)
-            self.person_img_small = self.person_img.subsample(20, 20)  # Make icon smaller
-        except:
-            self.person_img_small = None
+        self.person_img_small = cached_image(PERSON_ICON_PATH, 20)  # Make icon smaller
 
         # Create top frame with title and buttons
         self.top_frame = tk.Frame(root, bg=self.BG_DARK, height=120)
@@ -101,12 +2220,9 @@ class StudentManagerHybrid:
         title_frame.pack(pady=10)
 
         # Display logo in title bar if available
-        try:
-            self.logo_img = tk.PhotoImage(file=LOGO_PATH)
-            self.logo_img_small = self.logo_img.subsample(4, 4)
+        self.logo_img_small = cached_image(LOGO_PATH, 4)
+        if self.logo_img_small:
             tk.Label(title_frame, image=self.logo_img_small, bg=self.BG_DARK).pack(side="left", padx=5)
-        except:
-            self.logo_img_small = None
 
         # University title label
         tk.Label(title_frame, text="Bath Spa University - Student Manager",
@@ -118,10 +2234,168 @@ class StudentManagerHybrid:
         self.buttons_frame.pack()
         self.create_buttons_grid()
 
+        # Search bar: filters the grid by name or student number as you type
+        search_frame = tk.Frame(self.top_frame, bg=self.BG_DARK)
+        search_frame.pack(pady=(5, 0))
+        tk.Label(search_frame, text="🔍 Search name or student #:", font=("Arial", 11, "bold"),
+                 bg=self.BG_DARK, fg=self.TEXT_WHITE).pack(side="left", padx=5)
+        self.search_entry = tk.Entry(search_frame, bg=self.BG_LIGHT, fg="#2c3e50",
+                                     font=("Arial", 12), relief="flat", width=30)
+        self.search_entry.pack(side="left", ipadx=5, ipady=3)
+        self.search_entry.bind("<KeyRelease>", lambda e: self.on_search())
+        self.search_info = tk.Label(search_frame, text="", font=("Arial", 10),
+                                    bg=self.BG_DARK, fg=self.TEXT_WHITE, width=24, anchor="w")
+        self.search_info.pack(side="left", padx=5)
+
+        # Cohort picker, for the "cohorts" backend only (filled in once the manifest is loaded)
+        self.cohort_var = self.cohort_menu = None
+        if isinstance(self.storage, ShardedStorage):
+            tk.Label(search_frame, text="Cohort:", font=("Arial", 11, "bold"),
+                     bg=self.BG_DARK, fg=self.TEXT_WHITE).pack(side="left", padx=(15, 5))
+            self.cohort_var = tk.StringVar(value=self.storage.cohort)
+            self.cohort_menu = tk.OptionMenu(search_frame, self.cohort_var, "")
+            self.cohort_menu.config(bg=self.BG_LIGHT, relief="flat", width=16, highlightthickness=0)
+            self.cohort_menu.pack(side="left")
+            self.root.after(self.COHORT_EVICT_MS, self.evict_idle_cohorts)
+
+        # Status line for background loading/saving
+        self.status_label = tk.Label(self.top_frame, text="", font=("Arial", 10, "italic"),
+                                     bg=self.BG_DARK, fg=self.TEXT_WHITE)
+        self.status_label.pack(pady=(0, 5))
+
         # Bottom frame to display student info or lists
         self.bottom_frame = tk.Frame(root, bg=self.BG_LIGHT)
         self.bottom_frame.pack(fill="both", expand=True)
 
+        # Popups are built once, hidden, and shown again on later clicks
+        self.popups = {}
+        self.popup_builders = {
+            "input": ("300x150", self.build_input_popup),
+            "sort": ("360x360", self.build_sort_popup),
+            "add": ("330x480", self.build_add_popup),
+            "edit": ("330x480", self.build_edit_popup),
+        }
+        self.root.after_idle(self.prebuild_popups)
+
+        # Buttons stay disabled until the records have been loaded
+        self.set_buttons_state("disabled")
+        self.store_io.load(self.on_loaded, self.on_load_failed)
+
+    # ---------------- BACKGROUND LOAD / SAVE ----------------
+    def show_status(self, text):
+        # Show background I/O state (e.g. "Saving…") under the buttons
+        self.status_label.config(text=text)
+
+    def set_buttons_state(self, state):
+        for btn in self.buttons_frame.winfo_children():
+            btn.config(state="disabled" if self.read_only and btn in self.edit_buttons else state)
+
+    def on_loaded(self, students):
+        # Called on the Tk thread once the worker has loaded the records
+        self.students = students
+        students.prepare_search()
+        self.set_buttons_state("normal")
+        if self.cohort_menu is not None:
+            self.update_cohort_menu()
+        if students.load_errors:
+            # Report skipped lines, listing the first few with their line numbers
+            shown = "\n".join(f"Line {n}: {reason}" for n, line, reason in students.load_errors[:10])
+            more = len(students.load_errors) - 10
+            if more > 0:
+                shown += f"\n…and {more} more"
+            messagebox.showwarning("Skipped Records",
+                                   f"{len(students.load_errors)} line(s) in studentMarks.txt could not be loaded:\n\n{shown}")
+        if self.read_only:
+            self.show_status("Read-only: the records are open in another Student Manager")
+            messagebox.showwarning("Read-Only",
+                                   "The student records are already open for editing in another Student Manager "
+                                   "or the student service, so this window is read-only.\n\n"
+                                   "To edit them from several places at once, run student_service.py and start "
+                                   "the manager with STUDENT_STORAGE=service.")
+
+    def reload_students(self):
+        # Fetch the records again, e.g. after another client's edit won a conflict
+        self.set_buttons_state("disabled")
+
+        def loaded(students):
+            self.on_loaded(students)
+            self.view_all()
+        self.store_io.load(loaded, self.on_load_failed)
+
+    def update_cohort_menu(self):
+        # List every cohort in the manifest, plus the open one if it has not been saved yet
+        self.cohort_var.set(self.storage.cohort)
+        menu = self.cohort_menu["menu"]
+        menu.delete(0, "end")
+        for name in sorted(set(self.storage.cohorts()) | {self.storage.cohort}):
+            menu.add_command(label=name, command=lambda name=name: self.open_cohort(name))
+
+    def open_cohort(self, name):
+        # Switch the window to another cohort; it is loaded now and the old one is left
+        # to be dropped from memory once idle (its queued edits are still saved to it)
+        if name == self.storage.cohort:
+            return
+        self.storage.cohort = name
+        self.cohort_var.set(name)
+        self.reload_students()
+
+    def evict_idle_cohorts(self):
+        # Drop cohorts idle for COHORT_IDLE_SECONDS even when no other cohort is being opened
+        self.store_io.submit(self.storage.shards.evict_idle)
+        self.root.after(self.COHORT_EVICT_MS, self.evict_idle_cohorts)
+
+    def on_load_failed(self, error):
+        self.show_status("")
+        self.set_buttons_state("normal")
+        messagebox.showerror("Error", f"Could not load student records: {error}")
+
+    def on_close(self):
+        # Flush pending saves before the window goes away
+        self.show_status("Saving…")
+        self.root.update_idletasks()
+        self.store_io.close()
+        self.data_lock.release()
+        self.root.destroy()
+        clear_image_cache()
+
+    # ---------------- REUSABLE POPUPS ----------------
+    def popup(self, key):
+        # Hidden Toplevel for key, built by its popup_builders entry the first time it is needed
+        win = self.popups.get(key)
+        if win is None or not win.winfo_exists():
+            geometry, build = self.popup_builders[key]
+            win = tk.Toplevel(self.root)
+            win.withdraw()
+            win.geometry(geometry)
+            win.configure(bg=self.BG_DARK)
+            if self.icon_img:
+                win.iconphoto(False, self.icon_img)
+            win.visible = tk.BooleanVar(win, False)  # Written on show/hide, so modal callers can wait on it
+            win.protocol("WM_DELETE_WINDOW", lambda: self.hide_popup(win))
+            build(win)
+            self.popups[key] = win
+        return win
+
+    def prebuild_popups(self):
+        # Build every popup while the app is idle so the first click is as fast as the rest
+        for key in self.popup_builders:
+            self.popup(key)
+
+    def show_popup(self, win, modal=False):
+        # Show a prebuilt popup; modal popups grab input and return once hidden again
+        win.deiconify()
+        win.lift()
+        win.focus_set()
+        win.visible.set(True)
+        if modal:
+            win.grab_set()
+            win.wait_variable(win.visible)
+
+    def hide_popup(self, win):
+        win.grab_release()
+        win.withdraw()
+        win.visible.set(False)
+
     # ---------------- BUTTON CREATION ----------------
     def create_button(self, text, command, color, hover):
         # Helper function to create styled buttons with hover color
@@ -138,42 +2412,47 @@ class StudentManagerHybrid:
         self.create_button("Highest Score", self.show_highest, self.PURPLE, self.PURPLE_HOVER).grid(row=0, column=2, padx=5, pady=5)
         self.create_button("Lowest Score", self.show_lowest, self.RED, self.RED_HOVER).grid(row=0, column=3, padx=5, pady=5)
         self.create_button("Sort Records", self.sort_records, self.ORANGE, self.ORANGE_HOVER).grid(row=1, column=0, padx=5, pady=5)
-        self.create_button("Add Student", self.add_student, "#16a085", "#1abc9c").grid(row=1, column=1, padx=5, pady=5)
-        self.create_button("Delete Student", self.delete_student, self.RED, self.RED_HOVER).grid(row=1, column=2, padx=5, pady=5)
-        self.create_button("Update Student", self.update_student, "#f39c12", "#f1c40f").grid(row=1, column=3, padx=5, pady=5)
+        self.create_button("Statistics", self.show_statistics, self.BLUE, self.BLUE_HOVER).grid(row=0, column=4, padx=5, pady=5)
+
+        # Buttons that change the records, kept disabled in a read-only window
+        self.edit_buttons = [
+            self.create_button("Add Student", self.add_student, "#16a085", "#1abc9c"),
+            self.create_button("Delete Student", self.delete_student, self.RED, self.RED_HOVER),
+            self.create_button("Update Student", self.update_student, "#f39c12", "#f1c40f"),
+            self.create_button("Import CSV", self.import_csv, "#16a085", "#1abc9c"),
+        ]
+        for column, btn in enumerate(self.edit_buttons, 1):
+            btn.grid(row=1, column=column, padx=5, pady=5)
 
     # ---------------- INPUT VALIDATION POPUP ----------------
     def custom_input(self, title, prompt):
         # Pop-up window to get integer input with validation
-        win = tk.Toplevel()
+        win = self.popup("input")
         win.title(title)
-        win.geometry("300x150")
-        win.configure(bg=self.BG_DARK)
-        
-        # ------------------ Set popup icon ------------------
-        try:
-            logo_img = tk.PhotoImage(file=LOGO_PATH)  # Load logo.png
-            win.iconphoto(False, logo_img)            # Set as window icon
-        except Exception as e:
-            print(f"[⚠️] Could not load popup icon: {e}")
-
-        tk.Label(win, text=prompt, bg=self.BG_DARK, fg=self.TEXT_WHITE,
-                 font=("Arial", 12, "bold")).pack(pady=15)
-
-        entry = tk.Entry(win, bg=self.BG_LIGHT, fg="#2c3e50",
-                         font=("Arial", 12), relief="flat")
-        entry.pack(pady=5, ipadx=5, ipady=4)
-
-        result = {"value": None}  # Mutable container to store input
+        win.prompt.config(text=prompt)
+        win.entry.delete(0, "end")
+        win.result = None
+        win.after_idle(win.entry.focus_set)
+        self.show_popup(win, modal=True)  # Wait until closed
+        return win.result
+
+    def build_input_popup(self, win):
+        win.prompt = tk.Label(win, bg=self.BG_DARK, fg=self.TEXT_WHITE,
+                              font=("Arial", 12, "bold"))
+        win.prompt.pack(pady=15)
+
+        win.entry = tk.Entry(win, bg=self.BG_LIGHT, fg="#2c3e50",
+                             font=("Arial", 12), relief="flat")
+        win.entry.pack(pady=5, ipadx=5, ipady=4)
 
         def submit():
-            val = entry.get()
+            val = win.entry.get()
             if val.strip() == "":
                 messagebox.showerror("Error", "Input cannot be empty.")
                 return
             try:
-                result["value"] = int(val)  # Try converting to integer
-                win.destroy()
+                win.result = int(val)  # Try converting to integer
+                self.hide_popup(win)
             except ValueError:
                 messagebox.showerror("Error", "Please enter a valid integer.")
                 return
@@ -181,14 +2460,13 @@ class StudentManagerHybrid:
         tk.Button(win, text="OK", bg=self.GREEN, fg=self.TEXT_WHITE,
                   font=("Arial", 12, "bold"), relief="flat",
                   command=submit).pack(pady=15)
-
-        win.grab_set()  # Make this popup modal
-        win.wait_window()  # Wait until closed
-        return result["value"]
+        win.entry.bind("<Return>", lambda e: submit())
 
     # ---------------- STUDENT DISPLAY BOX ----------------
-    def create_student_box(self, parent, student):
+    @timed("create_student_box")
+    def create_student_box(self, parent, student=None, total=None, pct=None):
         # Create a box widget displaying the student's details with hover effect
+        # The labels are kept on box.labels so the box can be refilled and reused
         box_width = 280
         box_height = 200
 
@@ -199,64 +2477,105 @@ class StudentManagerHybrid:
         if self.person_img_small:
             tk.Label(box, image=self.person_img_small, bg="white").pack(pady=(0,5))
 
-        # Display student info labels
-        tk.Label(box, text=f"Name: {student['name']}", font=("Arial", 12, "bold"), bg="white", fg="#2980b9").pack(anchor="center")
-        tk.Label(box, text=f"Student #: {student['code']}", font=("Arial",11), bg="white").pack(anchor="center")
-        tk.Label(box, text=f"Coursework Total: {total_coursework(student)}/60", font=("Arial",11), bg="white").pack(anchor="center")
-        tk.Label(box, text=f"Exam: {student['exam']}/100", font=("Arial",11), bg="white").pack(anchor="center")
-        pct = overall_percentage(student)
-        tk.Label(box, text=f"Percentage: {pct}%", font=("Arial",11), bg="white").pack(anchor="center")
-        tk.Label(box, text=f"Grade: {grade(pct)}", font=("Arial",11,"bold"), bg="white").pack(anchor="center")
+        # Display student info labels (text is filled in by fill_student_box)
+        box.labels = {
+            "name": tk.Label(box, font=("Arial", 12, "bold"), bg="white", fg="#2980b9"),
+            "code": tk.Label(box, font=("Arial",11), bg="white"),
+            "total": tk.Label(box, font=("Arial",11), bg="white"),
+            "exam": tk.Label(box, font=("Arial",11), bg="white"),
+            "pct": tk.Label(box, font=("Arial",11), bg="white"),
+            "grade": tk.Label(box, font=("Arial",11,"bold"), bg="white")
+        }
+        for lbl in box.labels.values():
+            lbl.pack(anchor="center")
 
         # Hover effect: change background on mouse enter/leave
         def on_enter(e): box.config(bg=self.BOX_HOVER)
         def on_leave(e): box.config(bg="white")
         box.bind("<Enter>", on_enter)
         box.bind("<Leave>", on_leave)
+
+        if student is not None:
+            self.fill_student_box(box, student, total, pct)
         return box
 
+    @timed("fill_student_box")
+    def fill_student_box(self, box, student, total=None, pct=None):
+        # Write a student's details into an existing box
+        # total/pct come from the store's metrics cache unless passed in
+        if total is None or pct is None:
+            i = self.students.find(student["code"])
+            if i >= 0:
+                total, pct, _ = self.students.metrics(i)
+            else:
+                total, pct = total_coursework(student), overall_percentage(student)
+        box.labels["name"].config(text=f"Name: {student['name']}")
+        box.labels["code"].config(text=f"Student #: {student['code']}")
+        box.labels["total"].config(text=f"Coursework Total: {total}/60")
+        box.labels["exam"].config(text=f"Exam: {student['exam']}/100")
+        box.labels["pct"].config(text=f"Percentage: {pct}%")
+        box.labels["grade"].config(text=f"Grade: {grade(pct)}")
+
+    @timed("view_all")
     def view_all(self):
-        # Display all students in a scrollable grid of boxes
+        # Display all students in a scrollable grid of boxes, in the current sort view
+        # Only the rows near the viewport get widgets (see VirtualStudentGrid)
+        # A grid that is already showing (All Students or a search) is reused, refilling only
+        # its visible boxes
+        order = self.students.sorted_order(self.sort_keys) if self.sort_keys else None
+        if self.student_grid is not None and self.student_grid.showing:
+            self.student_grid.set_order(self.students, order, self.sort_keys,
+                                        scroll_top=not self.student_grid.full_view)
+            return
         for widget in self.bottom_frame.winfo_children():
             widget.destroy()  # Clear previous content
-
-        canvas = tk.Canvas(self.bottom_frame, bg=self.BG_LIGHT)
-        canvas.pack(side="left", fill="both", expand=True)
-
-        scrollbar = tk.Scrollbar(self.bottom_frame, command=canvas.yview)
-        scrollbar.pack(side="right", fill="y")
-
-        canvas.configure(yscrollcommand=scrollbar.set)
-
-        frame = tk.Frame(canvas, bg=self.BG_LIGHT)
-        canvas.create_window((0,0), window=frame, anchor="nw")
-
-        max_cols = 4  # Number of columns in grid
-        row = col = 0
-        for s in self.students:
-            box = self.create_student_box(frame, s)
-            box.grid(row=row, column=col, padx=10, pady=10)
-            frame.grid_columnconfigure(col, weight=1)
-            col += 1
-            if col >= max_cols:
-                col = 0
-                row += 1
-
-        frame.update_idletasks()
-        canvas.config(scrollregion=canvas.bbox("all"))
+        self.student_grid = VirtualStudentGrid(self, self.bottom_frame, self.students, order,
+                                               self.sort_keys)
+
+    def grid_changed(self, change, *args):
+        # Apply one edit to the grid in place, e.g. grid_changed("row_updated", i), so the
+        # cost follows the size of the edit; rebuilds View All if another view is showing
+        grid = self.student_grid
+        if grid is not None and grid.full_view and grid.students is self.students:
+            getattr(grid, change)(*args)
+        else:
+            self.view_all()
 
     # ---------------- STUDENT VIEW/SEARCH ----------------
+    @timed("on_search")
+    def on_search(self):
+        # Filter the grid by the text in the search bar, on every keystroke
+        query = self.search_entry.get().strip()
+        if not query:
+            self.search_info.config(text="")
+            self.view_all()
+            return
+        rows = self.students.search(query, self.SEARCH_LIMIT)
+        if not rows:
+            self.search_info.config(text="No matches")
+        else:
+            more = "+" if len(rows) >= self.SEARCH_LIMIT else ""
+            self.search_info.config(text=f"{len(rows)}{more} match(es)")
+        # Keystrokes refill the boxes of the grid already showing; it is only built when missing
+        if self.student_grid is not None and self.student_grid.showing:
+            self.student_grid.set_order(self.students, rows, None, scroll_top=True)
+            return
+        for widget in self.bottom_frame.winfo_children():
+            widget.destroy()
+        self.student_grid = VirtualStudentGrid(self, self.bottom_frame, self.students, rows)
+
     def view_individual(self):
         # Prompt for student number and display individual student's info
         code = self.custom_input("View Student", "Enter student number:")
         if code is None:  # Cancelled or invalid input
             return
-        for s in self.students:
-            if s["code"] == code:
-                self.view_single_student(s)
-                return
-        messagebox.showerror("Error", "Student not found.")
+        i = self.students.find(code)
+        if i < 0:
+            messagebox.showerror("Error", "Student not found.")
+            return
+        self.view_single_student(self.students.row(i))
 
+    @timed("view_single_student")
     def view_single_student(self, student):
         # Display single student box on bottom frame
         for widget in self.bottom_frame.winfo_children():
@@ -265,75 +2584,180 @@ class StudentManagerHybrid:
         box.pack(padx=20, pady=20)
 
     # ---------------- HIGHEST / LOWEST SCORER ----------------
+    @timed("show_highest")
     def show_highest(self):
-        # Show student with highest overall percentage
+        # Show the top students by overall percentage
         if not self.students: return
-        best = max(self.students, key=lambda s: overall_percentage(s))
-        self.view_single_student(best)
+        self.view_leaderboard(f"🏆 Top {self.LEADERBOARD_SIZE} Students",
+                              self.students.top(self.LEADERBOARD_SIZE), self.PURPLE)
 
+    @timed("show_lowest")
     def show_lowest(self):
-        # Show student with lowest overall percentage
+        # Show the bottom students by overall percentage
         if not self.students: return
-        worst = min(self.students, key=lambda s: overall_percentage(s))
-        self.view_single_student(worst)
+        self.view_leaderboard(f"Bottom {self.LEADERBOARD_SIZE} Students",
+                              self.students.bottom(self.LEADERBOARD_SIZE), self.RED)
+
+    def view_leaderboard(self, title, students, color):
+        # Display ranked students as numbered boxes, five to a row
+        for widget in self.bottom_frame.winfo_children():
+            widget.destroy()
+        tk.Label(self.bottom_frame, text=title, font=("DM Serif Text", 18, "bold"),
+                 bg=self.BG_LIGHT, fg=color).pack(pady=(15, 5))
+        board = tk.Frame(self.bottom_frame, bg=self.BG_LIGHT)
+        board.pack()
+        for rank, student in enumerate(students, 1):
+            cell = tk.Frame(board, bg=self.BG_LIGHT)
+            cell.grid(row=(rank - 1) // 5, column=(rank - 1) % 5, padx=8, pady=8)
+            tk.Label(cell, text=f"#{rank}", font=("Arial", 12, "bold"),
+                     bg=self.BG_LIGHT, fg=color).pack()
+            self.create_student_box(cell, student).pack()
+
+    # ---------------- COHORT STATISTICS ----------------
+    @timed("show_statistics")
+    def show_statistics(self):
+        # Display cohort summary, grade distribution, percentage histogram and per-component stats
+        for widget in self.bottom_frame.winfo_children():
+            widget.destroy()
+        stats = self.students.stats()
+        if not stats.count:
+            tk.Label(self.bottom_frame, text="No students loaded.", font=("Arial", 14),
+                     bg=self.BG_LIGHT).pack(pady=30)
+            return
+
+        tk.Label(self.bottom_frame, text="📊 Cohort Statistics", font=("DM Serif Text", 18, "bold"),
+                 bg=self.BG_LIGHT, fg=self.BLUE).pack(pady=(15, 5))
+        summary = (f"Students: {stats.count}    Average: {stats.mean_percentage()}%    "
+                   f"Median: {stats.percentage_percentile(50)}%    "
+                   f"Lowest: {_percentage_of(stats.minimum('total'))}%    "
+                   f"Highest: {_percentage_of(stats.maximum('total'))}%")
+        tk.Label(self.bottom_frame, text=summary, font=("Arial", 12, "bold"), bg=self.BG_LIGHT).pack()
+        percentiles = "    ".join(f"P{p}: {stats.percentage_percentile(p)}%" for p in (10, 25, 75, 90))
+        tk.Label(self.bottom_frame, text=percentiles, font=("Arial", 11), bg=self.BG_LIGHT).pack(pady=(0, 10))
+
+        charts = tk.Frame(self.bottom_frame, bg=self.BG_LIGHT)
+        charts.pack()
+        grades = stats.grade_distribution()
+        self.draw_bar_chart(charts, "Grade Distribution", [(g, grades[g]) for g in "ABCDF"],
+                            self.PURPLE).grid(row=0, column=0, padx=15)
+        bands = [(f"{start}-{start + 9}" if start < 90 else "90+", n)
+                 for start, n in stats.percentage_histogram(10)]
+        self.draw_bar_chart(charts, "Percentage Histogram", bands,
+                            self.GREEN).grid(row=0, column=1, padx=15)
+
+        # Per-component table
+        table = tk.Frame(self.bottom_frame, bg="white", bd=2, relief="groove")
+        table.pack(pady=15)
+        headings = ["", "Mean", "Median", "Std Dev", "Min", "Max"]
+        rows = [("C1 (/20)", "c1"), ("C2 (/20)", "c2"), ("C3 (/20)", "c3"),
+                ("Exam (/100)", "exam"), ("Total (/160)", "total")]
+        for col, text in enumerate(headings):
+            tk.Label(table, text=text, font=("Arial", 11, "bold"), bg="white", width=12).grid(row=0, column=col)
+        for r, (label, name) in enumerate(rows, 1):
+            values = [label, f"{stats.mean(name):.2f}", f"{stats.median(name):g}", f"{stats.stdev(name):.2f}",
+                      stats.minimum(name), stats.maximum(name)]
+            for col, value in enumerate(values):
+                tk.Label(table, text=value, font=("Arial", 11, "bold" if col == 0 else ""),
+                         bg="white", width=12).grid(row=r, column=col)
+
+    def draw_bar_chart(self, parent, title, bars, color, width=420, height=220):
+        # Simple labelled bar chart on a Canvas; bars is a list of (label, value)
+        canvas = tk.Canvas(parent, width=width, height=height, bg="white", highlightthickness=1)
+        canvas.create_text(width / 2, 14, text=title, font=("Arial", 12, "bold"))
+        top, bottom = 40, height - 25
+        peak = max((value for _, value in bars), default=0) or 1
+        slot = width / len(bars)
+        for i, (label, value) in enumerate(bars):
+            x0 = i * slot + slot * 0.15
+            x1 = (i + 1) * slot - slot * 0.15
+            y0 = bottom - (bottom - top) * value / peak
+            canvas.create_rectangle(x0, y0, x1, bottom, fill=color, outline="")
+            canvas.create_text((x0 + x1) / 2, y0 - 8, text=str(value), font=("Arial", 9))
+            canvas.create_text((x0 + x1) / 2, bottom + 12, text=label, font=("Arial", 9))
+        return canvas
 
     # ---------------- SORTING RECORDS ----------------
+    SORT_CHOICES = {"Percentage": "percentage", "Name": "name", "Student #": "code",
+                    "Exam": "exam", "Coursework Total": "coursework"}
+    SORT_LEVELS = 3  # Number of "then by" keys offered in the sort popup
+
     def sort_popup(self):
-        # Popup window to choose ascending or descending sorting
-        win = tk.Toplevel()
+        # Popup window to choose up to SORT_LEVELS sort keys, each ascending or descending
+        # Returns a list of (field, descending) pairs, [] for original order, or None if closed
+        win = self.popup("sort")
+
+        # Pre-fill with the current sort view
+        current = {field: label for label, field in self.SORT_CHOICES.items()}
+        for level, (field_var, desc_var) in enumerate(win.levels):
+            if level < len(self.sort_keys):
+                field_var.set(current[self.sort_keys[level][0]])
+                desc_var.set(self.sort_keys[level][1])
+            else:
+                field_var.set(list(self.SORT_CHOICES)[0] if level == 0 else "(none)")
+                desc_var.set(level == 0)
+        win.result = None
+        self.show_popup(win, modal=True)
+        return win.result
+
+    def build_sort_popup(self, win):
         win.title("Sort Records")
-        win.geometry("300x180")
-        win.configure(bg=self.BG_DARK)
-        
-        # ------------------ Set popup icon ------------------
-        try:
-            logo_img = tk.PhotoImage(file=LOGO_PATH)  # Load logo.png
-            win.iconphoto(False, logo_img)            # Set as window icon
-        except Exception as e:
-            print(f"[⚠️] Could not load popup icon: {e}")
-
-        tk.Label(win, text="Sort by percentage:", bg=self.BG_DARK, fg=self.TEXT_WHITE,
+        tk.Label(win, text="Sort view by:", bg=self.BG_DARK, fg=self.TEXT_WHITE,
                  font=("Arial", 12, "bold")).pack(pady=15)
 
-        result = {"choice": None}
-
-        tk.Button(win, text="Ascending", bg=self.GREEN, fg=self.TEXT_WHITE,
+        win.levels = []
+        for level in range(self.SORT_LEVELS):
+            row = tk.Frame(win, bg=self.BG_DARK)
+            row.pack(pady=5)
+            tk.Label(row, text="Sort by" if level == 0 else "then by", width=7, anchor="e",
+                     bg=self.BG_DARK, fg=self.TEXT_WHITE, font=("Arial", 11)).pack(side="left", padx=5)
+            options = list(self.SORT_CHOICES) if level == 0 else ["(none)"] + list(self.SORT_CHOICES)
+            field_var = tk.StringVar(win, options[0])
+            desc_var = tk.BooleanVar(win, level == 0)
+            tk.OptionMenu(row, field_var, *options).pack(side="left")
+            tk.Checkbutton(row, text="Descending", variable=desc_var, bg=self.BG_DARK, fg=self.TEXT_WHITE,
+                           selectcolor=self.BG_DARK, activebackground=self.BG_DARK).pack(side="left", padx=5)
+            win.levels.append((field_var, desc_var))
+
+        def apply():
+            keys = []
+            for field_var, desc_var in win.levels:
+                field = self.SORT_CHOICES.get(field_var.get())
+                if field and field not in (k for k, d in keys):
+                    keys.append((field, desc_var.get()))
+            win.result = keys
+            self.hide_popup(win)
+
+        def original_order():
+            win.result = []
+            self.hide_popup(win)
+
+        tk.Button(win, text="Apply", bg=self.GREEN, fg=self.TEXT_WHITE,
                   font=("Arial", 12, "bold"), relief="flat",
-                  command=lambda: [result.update({"choice":"asc"}), win.destroy()]).pack(pady=5, ipadx=10, ipady=5)
+                  command=apply).pack(pady=(15, 5), ipadx=10, ipady=5)
 
-        tk.Button(win, text="Descending", bg=self.RED, fg=self.TEXT_WHITE,
+        tk.Button(win, text="Original Order", bg=self.RED, fg=self.TEXT_WHITE,
                   font=("Arial", 12, "bold"), relief="flat",
-                  command=lambda: [result.update({"choice":"desc"}), win.destroy()]).pack(pady=5, ipadx=10, ipady=5)
-
-        win.grab_set()
-        win.wait_window()
-
-        return result["choice"]
+                  command=original_order).pack(pady=5, ipadx=10, ipady=5)
 
     def sort_records(self):
-        # Sort student list by overall percentage and save
-        choice = self.sort_popup()
-        if not choice: return
-        self.students.sort(key=lambda s: overall_percentage(s), reverse=(choice=="desc"))
-        save_students(self.students)
-        messagebox.showinfo("Sorted", "Records sorted successfully.")
-        self.view_all()
+        # Show the records in a sort view; the stored order and the file are not changed
+        keys = self.sort_popup()
+        if keys is None: return
+        with METRICS.time("sort_records"):
+            self.sort_keys = keys
+            self.view_all()
 
     # ---------------- ADD NEW STUDENT ----------------
     def add_student(self):
-        # Popup window to add new student details
-        win = tk.Toplevel()
+        # Popup window to add new student details, starting from empty fields
+        win = self.popup("add")
+        for e in win.entries.values():
+            e.delete(0, "end")
+        self.show_popup(win)
+        win.entries["Code"].focus_set()
+
+    def build_add_popup(self, win):
         win.title("Add Student")
-        win.geometry("330x480")
-        win.configure(bg=self.BG_DARK)
-        
-        # ------------------ Set popup icon ------------------
-        try:
-            logo_img = tk.PhotoImage(file=LOGO_PATH)
-            win.iconphoto(False, logo_img)
-        except Exception as e:
-            print(f"[⚠️] Could not load popup icon: {e}")
-
         tk.Label(win, text="Add New Student", bg=self.BG_DARK, fg=self.TEXT_WHITE,
                  font=("Arial", 18, "bold")).pack(pady=10)
 
@@ -346,6 +2770,7 @@ class StudentManagerHybrid:
             e = tk.Entry(win, bg="#dcdde1", fg="#2f3640", font=("Arial", 12), relief="flat")
             e.pack(pady=2, ipadx=4, ipady=4)
             entries[lbl] = e
+        win.entries = entries
 
         def save_student():
             # Validate and save new student data
@@ -363,100 +2788,520 @@ class StudentManagerHybrid:
                 messagebox.showerror("Error", "Code, C1, C2, C3, and Exam must be integers.")
                 return
 
+            error = marks_error(c1_val, c2_val, c3_val, exam_val)
+            if error:
+                messagebox.showerror("Error", f"Invalid mark: {error}.")
+                return
+            if code_val in self.students:
+                messagebox.showerror("Error", f"Student code {code_val} already exists.")
+                return
+
             s = {"code": code_val, "name": name_val, "c1": c1_val, "c2": c2_val, "c3": c3_val, "exam": exam_val}
-            self.students.append(s)
-            save_students(self.students)
+            try:
+                with METRICS.time("add_student"):
+                    self.students.append(s)
+                    self.store_io.record(self.students, "add", s)
+            except OverflowError:
+                messagebox.showerror("Error", "One of the values is too large.")
+                return
             messagebox.showinfo("Added","Student added successfully.")
-            win.destroy()
-            self.view_all()
+            self.hide_popup(win)
+            self.grid_changed("row_added", len(self.students) - 1)
 
         # Save button
         tk.Button(win, text="SAVE STUDENT", command=save_student, bg=self.GREEN, fg=self.TEXT_WHITE,
                   font=("Arial", 14, "bold"), relief="flat", width=20).pack(pady=20)
 
+    # ---------------- BULK IMPORT ----------------
+    REPORT_ROWS = 500  # Rejected rows listed in the import popup (the report file has them all)
+
+    def import_csv(self):
+        # Choose CSV mark sheets, parse them in the import process pool off the Tk thread,
+        # then merge the valid rows and show what was rejected
+        paths = filedialog.askopenfilenames(
+            title="Import Mark Sheets",
+            filetypes=[("CSV files", "*.csv"), ("Text files", "*.txt"), ("All files", "*.*")])
+        if not paths:
+            return
+        existing = frozenset(self.students.code)
+
+        def run_import():
+            result = import_csv_files(paths, existing)
+            if result.rejected:
+                result.write_report()
+            return result
+
+        self.set_buttons_state("disabled")
+        self.show_status("Importing…")
+        self.store_io.submit(run_import, on_done=self.on_imported, on_error=self.on_import_failed)
+
+    def on_imported(self, result):
+        # Called on the Tk thread with the ImportResult
+        self.set_buttons_state("normal")
+        self.show_status("")
+        with METRICS.time("import_merge"):
+            result.discard_existing(self.students)
+            if len(result.rows):
+                self.students.extend(result.rows)
+                self.store_io.record(self.students, "import", result.rows)
+        self.show_import_report(result)
+        self.view_all()
+
+    def on_import_failed(self, error):
+        self.set_buttons_state("normal")
+        self.show_status("")
+        messagebox.showerror("Error", f"Could not import mark sheets: {error}")
+
+    def show_import_report(self, result):
+        # Popup summarising the import with the first rejected rows
+        win = tk.Toplevel()
+        win.title("Import Report")
+        win.geometry("640x420")
+        win.configure(bg=self.BG_DARK)
+        summary = (f"Imported {len(result.rows)} student(s) from {len(result.files)} file(s).\n"
+                   f"Rejected {len(result.rejected)} row(s).")
+        tk.Label(win, text=summary, bg=self.BG_DARK, fg=self.TEXT_WHITE,
+                 font=("Arial", 13, "bold")).pack(pady=10)
+        if not result.rejected:
+            return
+        frame = tk.Frame(win)
+        frame.pack(fill="both", expand=True, padx=10)
+        text = tk.Text(frame, font=("Consolas", 10), wrap="none")
+        scroll = tk.Scrollbar(frame, command=text.yview)
+        text.config(yscrollcommand=scroll.set)
+        scroll.pack(side="right", fill="y")
+        text.pack(side="left", fill="both", expand=True)
+        for file, line_no, line, reason in result.rejected[:self.REPORT_ROWS]:
+            where = f"{os.path.basename(file)}:{line_no}" if file else "(import)"
+            text.insert("end", f"{where}: {reason}: {line}\n")
+        text.config(state="disabled")
+        tk.Label(win, text=f"Full report saved to {IMPORT_REPORT_PATH}", bg=self.BG_DARK,
+                 fg=self.TEXT_WHITE, font=("Arial", 10)).pack(pady=8)
+
     # ---------------- DELETE STUDENT ----------------
     def delete_student(self):
         # Prompt for student number, remove if found
         code = self.custom_input("Delete Student", "Enter student number:")
         if code is None: return
-        for s in self.students:
-            if s["code"]==code:
-                self.students.remove(s)
-                save_students(self.students)
-                messagebox.showinfo("Deleted","Student removed.")
-                self.view_all()
-                return
-        messagebox.showerror("Error","Student not found.")
+        i = self.students.find(code)
+        if i < 0:
+            messagebox.showerror("Error","Student not found.")
+            return
+        last = len(self.students) - 1  # The row that moves into i (see StudentStore.delete)
+        with METRICS.time("delete_student"):
+            self.students.delete(i)
+            self.store_io.record(self.students, "delete", code)
+        messagebox.showinfo("Deleted","Student removed.")
+        self.grid_changed("row_deleted", i, last)
 
     # ---------------- UPDATE STUDENT ----------------
     def update_student(self):
         # Prompt for student number, open update window if found
         code = self.custom_input("Update Student", "Enter student number:")
         if code is None: return
-        for s in self.students:
-            if s["code"]==code:
-                self.edit_student_window(s)
-                return
-        messagebox.showerror("Error","Student not found.")
+        i = self.students.find(code)
+        if i < 0:
+            messagebox.showerror("Error","Student not found.")
+            return
+        self.edit_student_window(self.students.row(i))
 
     def edit_student_window(self, student):
         # Popup window to edit existing student info
-        win = tk.Toplevel()
-        win.title("Edit Student")
-        win.geometry("330x480")
-        win.configure(bg=self.BG_DARK)
+        win = self.popup("edit")
+        win.student = student
+        win.heading.config(text=f"Edit Student #{student['code']}")
 
-        # ------------------ Set popup icon ------------------
-        try:
-            logo_img = tk.PhotoImage(file=LOGO_PATH)
-            win.iconphoto(False, logo_img)
-        except Exception as e:
-            print(f"[⚠️] Could not load popup icon: {e}")
+        # Pre-fill existing values
+        for lbl, field in (("Name", "name"), ("C1", "c1"), ("C2", "c2"), ("C3", "c3"), ("Exam", "exam")):
+            win.entries[lbl].delete(0, "end")
+            win.entries[lbl].insert(0, str(student[field]))
+        self.show_popup(win)
 
-        tk.Label(win, text=f"Edit Student #{student['code']}", bg=self.BG_DARK, fg=self.TEXT_WHITE,
-                 font=("Arial", 18, "bold")).pack(pady=10)
+    def build_edit_popup(self, win):
+        win.title("Edit Student")
+        win.heading = tk.Label(win, bg=self.BG_DARK, fg=self.TEXT_WHITE, font=("Arial", 18, "bold"))
+        win.heading.pack(pady=10)
 
         labels = ["Name","C1","C2","C3","Exam"]
         entries = {}
 
-        # Create entry widgets with pre-filled values
+        # Create entry widgets, filled in each time the popup is shown
         for lbl in labels:
             tk.Label(win, text=lbl, bg=self.BG_DARK, fg=self.TEXT_WHITE, font=("Arial", 12, "bold")).pack(pady=5)
             e = tk.Entry(win, bg="#dcdde1", fg="#2f3640", font=("Arial", 12), relief="flat")
             e.pack(pady=2, ipadx=4, ipady=4)
             entries[lbl] = e
-
-        # Pre-fill existing values
-        entries["Name"].insert(0, student["name"])
-        entries["C1"].insert(0, str(student["c1"]))
-        entries["C2"].insert(0, str(student["c2"]))
-        entries["C3"].insert(0, str(student["c3"]))
-        entries["Exam"].insert(0, str(student["exam"]))
+        win.entries = entries
 
         def save_edit():
-            # Save edited data back to student object
+            # Save edited data back into the store row for this student
+            student = win.student
             try:
-                student["name"] = entries["Name"].get().strip()
-                student["c1"] = int(entries["C1"].get())
-                student["c2"] = int(entries["C2"].get())
-                student["c3"] = int(entries["C3"].get())
-                student["exam"] = int(entries["Exam"].get())
-                if student["name"] == "":
+                edited = {
+                    "code": student["code"],
+                    "name": entries["Name"].get().strip(),
+                    "c1": int(entries["C1"].get()),
+                    "c2": int(entries["C2"].get()),
+                    "c3": int(entries["C3"].get()),
+                    "exam": int(entries["Exam"].get())
+                }
+                if edited["name"] == "":
                     messagebox.showerror("Error","Name cannot be empty.")
                     return
             except ValueError:
                 messagebox.showerror("Error","C1, C2, C3, Exam must be integers.")
                 return
-            save_students(self.students)
+            error = marks_error(edited["c1"], edited["c2"], edited["c3"], edited["exam"])
+            if error:
+                messagebox.showerror("Error", f"Invalid mark: {error}.")
+                return
+            i = self.students.find(student["code"])
+            if i < 0:  # Deleted while the edit window was open
+                messagebox.showerror("Error","Student not found.")
+                return
+            try:
+                with METRICS.time("update_student"):
+                    self.students.update(i, edited)
+                    self.store_io.record(self.students, "update", edited)
+            except OverflowError:
+                messagebox.showerror("Error","One of the values is too large.")
+                return
             messagebox.showinfo("Updated","Student updated successfully.")
-            win.destroy()
-            self.view_all()
+            self.hide_popup(win)
+            self.grid_changed("row_updated", i)
 
         tk.Button(win, text="SAVE CHANGES", command=save_edit, bg=self.GREEN, fg=self.TEXT_WHITE,
                   font=("Arial", 14, "bold"), relief="flat", width=20).pack(pady=20)
 
+# ---------------- VIRTUALIZED STUDENT GRID ----------------
+class VirtualStudentGrid:
+    # Scrollable grid that only builds boxes for the rows near the viewport.
+    # Boxes that scroll out of view are recycled for the rows scrolling in, so the
+    # number of widgets (and the work per scroll) does not grow with the cohort.
+    # Edits are applied in place through row_added/row_updated/row_deleted/set_order;
+    # only the boxes whose grid position changed are refilled, never the whole grid.
+    MAX_COLS = 4     # Number of columns in grid
+    CELL_W = 300     # Box width plus padding
+    CELL_H = 220     # Box height plus padding
+    PAD = 10         # Padding around each box
+    OVERSCAN = 1     # Extra rows built above and below the visible area
+
+    def __init__(self, app, parent, students, order=None, keys=None):
+        self.app = app
+        self.students = students
+        self.order = order  # Row index to show at each grid position (None = stored order)
+        self.keys = keys    # Sort keys order was built from, None for a search result
+        self.pool = []  # Recycled boxes: [box, canvas window id, grid position, -1 if hidden or None if stale]
+
+        self.canvas = tk.Canvas(parent, bg=app.BG_LIGHT)
+        self.canvas.pack(side="left", fill="both", expand=True)
+
+        self.scrollbar = tk.Scrollbar(parent, command=self.canvas.yview)
+        self.scrollbar.pack(side="right", fill="y")
+
+        # Every change of the view (scrollbar, resize) goes through on_scroll
+        self.canvas.configure(yscrollcommand=self.on_scroll)
+        self.canvas.bind("<Configure>", lambda e: self.refresh())
+
+        self.resize()
+        self.refresh()
+
+    def __len__(self):
+        # Number of grid positions
+        return len(self.order) if self.order is not None else len(self.students)
+
+    @property
+    def showing(self):
+        # True while the grid is still on screen (not cleared for another view)
+        return bool(self.canvas.winfo_exists())
+
+    @property
+    def full_view(self):
+        # True when the grid shows every student (stored order or a sort view), not a search
+        return self.keys is not None and self.showing
+
+    def resize(self):
+        # Fit the scroll region to the number of positions
+        rows = -(-len(self) // self.MAX_COLS)  # Ceiling division
+        self.canvas.config(scrollregion=(0, 0, self.MAX_COLS * self.CELL_W + self.PAD,
+                                         rows * self.CELL_H + self.PAD))
+
+    def on_scroll(self, first, last):
+        # Keep the scrollbar in sync and fill in the rows that came into view
+        self.scrollbar.set(first, last)
+        self.refresh()
+
+    def visible_range(self):
+        # Grid positions that should currently have a box
+        top = self.canvas.canvasy(0)
+        height = max(self.canvas.winfo_height(), self.CELL_H)
+        first_row = max(0, int(top // self.CELL_H) - self.OVERSCAN)
+        last_row = int((top + height) // self.CELL_H) + self.OVERSCAN
+        return range(first_row * self.MAX_COLS,
+                     min(len(self), (last_row + 1) * self.MAX_COLS))
+
+    @timed("grid_refresh")
+    def refresh(self):
+        # Place a box on every visible position, reusing boxes that left the viewport
+        visible = self.visible_range()
+        totals, pcts = self.students.totals(), self.students.percentages()
+        shown = {}
+        free = []
+        for slot in self.pool:
+            if slot[2] in visible:
+                shown[slot[2]] = slot
+            else:
+                free.append(slot)
+
+        for i in visible:
+            if i in shown:
+                continue  # Already showing the right student
+            if free:
+                slot = free.pop()
+            else:
+                box = self.app.create_student_box(self.canvas)
+                slot = [box, self.canvas.create_window(0, 0, window=box, anchor="nw"), -1]
+                self.pool.append(slot)
+            slot[2] = i
+            r = self.order[i] if self.order is not None else i
+            self.app.fill_student_box(slot[0], self.students.row(r), totals[r], pcts[r])
+            row, col = divmod(i, self.MAX_COLS)
+            self.canvas.coords(slot[1], self.PAD + col * self.CELL_W, self.PAD + row * self.CELL_H)
+            self.canvas.itemconfigure(slot[1], state="normal")
+
+        # Hide whatever is left over until it is needed again
+        for slot in free:
+            if slot[2] != -1:
+                slot[2] = -1
+                self.canvas.itemconfigure(slot[1], state="hidden")
+
+    # ---- In-place updates after an edit ----
+    def invalidate(self, start, stop=None):
+        # Mark the boxes at positions start..stop (default: to the end) as stale, so the
+        # next refresh refills just those and leaves every other box alone
+        for slot in self.pool:
+            if slot[2] is not None and slot[2] >= start and (stop is None or slot[2] < stop):
+                slot[2] = None
+
+    def row_added(self, i):
+        # Row i was appended to the store
+        if self.order is not None:
+            pos = self.students.insert_position(self.order, i, self.keys)
+            self.order.insert(pos, i)
+            self.invalidate(pos)  # Everything after pos moves along one box
+        self.resize()
+        self.refresh()
+
+    def row_updated(self, i):
+        # Row i was overwritten; in a sort view it may have to move to a new position
+        pos = old = i
+        if self.order is not None:
+            old = self.order.index(i)
+            del self.order[old]
+            pos = self.students.insert_position(self.order, i, self.keys)
+            self.order.insert(pos, i)
+        self.invalidate(min(old, pos), max(old, pos) + 1)
+        self.refresh()
+
+    def row_deleted(self, i, last):
+        # Row i was removed by swap-remove: the row stored at index last now lives at i
+        if self.order is None:
+            self.invalidate(i, i + 1)  # The moved row takes over the deleted row's box
+        else:
+            pos = self.order.index(i)
+            del self.order[pos]
+            if i != last:
+                self.order[self.order.index(last)] = i  # Same record, same box, new row index
+            self.invalidate(pos)
+        self.resize()
+        self.refresh()
+
+    def set_order(self, students, order, keys, scroll_top=False):
+        # Show a new sort view, search result or reloaded records in the existing boxes:
+        # only the visible positions are refilled
+        self.students = students
+        self.order = order
+        self.keys = keys
+        self.invalidate(0)
+        self.resize()
+        if scroll_top:
+            self.canvas.yview_moveto(0)
+        self.refresh()
+
+# ---------------- COMMAND LINE ----------------
+REPORT_FIELDS = ("code", "name", "c1", "c2", "c3", "exam", "coursework", "percentage", "grade")
+SUMMARY_FIELDS = ("group", "count", "mean", "min", "p10", "p25", "median", "p75", "p90", "max")
+COHORT_FIELDS = ("cohort", "count", "min_percentage", "max_percentage")
+
+def report_rows(students, keys=(), grades=None, min_pct=None, max_pct=None, limit=None):
+    # Yield report rows one at a time: filtered by grade/percentage, ordered by
+    # (field, descending) keys, with the same coursework, percentage and grade as the GUI
+    totals, pcts, letters = students.totals(), students.percentages(), students.grades()
+    order = students.sorted_order(list(keys)) if keys else range(len(students))
+    count = 0
+    for i in order:
+        if limit is not None and count >= limit:
+            break
+        if grades and letters[i] not in grades:
+            continue
+        if (min_pct is not None and pcts[i] < min_pct) or (max_pct is not None and pcts[i] > max_pct):
+            continue
+        s = students.row(i)
+        s.update(coursework=totals[i], percentage=pcts[i], grade=letters[i])
+        count += 1
+        yield s
+
+def summary_rows(students, by=None):
+    # Yield percentage statistics for the whole cohort, or one row per grade
+    if by == "grade":
+        groups = {}
+        for letter, marks in zip(students.grades(), zip(students.c1, students.c2, students.c3, students.exam)):
+            groups.setdefault(letter, CohortStats()).add(*marks)
+        groups = {letter: groups[letter] for letter in "ABCDF" if letter in groups}
+    else:
+        groups = {"all": students.stats()}
+    for group, stats in groups.items():
+        yield {"group": group, "count": stats.count, "mean": stats.mean_percentage(),
+               "min": _percentage_of(stats.minimum("total")),
+               "p10": stats.percentage_percentile(10), "p25": stats.percentage_percentile(25),
+               "median": stats.percentage_percentile(50), "p75": stats.percentage_percentile(75),
+               "p90": stats.percentage_percentile(90), "max": _percentage_of(stats.maximum("total"))}
+
+def cohort_rows(shards, top=None, bottom=None):
+    # Yield one manifest row per cohort, or the top/bottom students across every cohort
+    if top is None and bottom is None:
+        for name in shards.names():
+            entry = shards.manifest[name]
+            yield {"cohort": name, "count": entry["count"], "min_percentage": entry["min_percentage"],
+                   "max_percentage": entry["max_percentage"]}
+        return
+    for name, s in shards.top(bottom if top is None else top, lowest=top is None):
+        pct = overall_percentage(s)
+        yield dict(cohort=name, **s, coursework=total_coursework(s), percentage=pct, grade=grade(pct))
+
+def write_records(rows, fmt, fields, out=None):
+    # Stream dict rows to out as CSV (with a header) or JSON Lines, one row at a time
+    out = out or sys.stdout
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=fields, lineterminator="\n")
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+    else:
+        for row in rows:
+            out.write(json.dumps(row) + "\n")
+
+def _sort_key_arg(text):
+    # "percentage:desc" -> ("percentage", True)
+    field, _, direction = text.partition(":")
+    if field not in StudentStore.SORT_FIELDS or direction not in ("", "asc", "desc"):
+        raise argparse.ArgumentTypeError(
+            f"expected FIELD[:asc|desc] with FIELD one of {', '.join(StudentStore.SORT_FIELDS)}")
+    return field, direction == "desc"
+
+def _count_arg(text):
+    # A number of students, at least 1
+    try:
+        n = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a whole number, got {text!r}") from None
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"expected at least 1, got {n}")
+    return n
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Student Manager. Run without a command to open the GUI.")
+    parser.add_argument("--backend", choices=sorted(STORAGE_BACKENDS),
+                        help=f"storage backend (default: {STORAGE_BACKEND})")
+    parser.add_argument("--cohort", help="cohort to open with the cohorts backend (default: first by name)")
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument("--format", choices=("csv", "jsonl"), default="csv", help="output format (default: csv)")
+    rows = argparse.ArgumentParser(add_help=False)  # Which students, in what order
+    rows.add_argument("--sort", action="append", type=_sort_key_arg, default=[], metavar="FIELD[:desc]",
+                      help="sort key, repeat for tie-breakers (fields: %s)" % ", ".join(StudentStore.SORT_FIELDS))
+    rows.add_argument("--grade", action="append", choices=list("ABCDF"), help="only these grades (repeatable)")
+    rows.add_argument("--min-percentage", type=float, help="only students at or above this percentage")
+    rows.add_argument("--max-percentage", type=float, help="only students at or below this percentage")
+    rows.add_argument("--limit", type=int, help="stop after this many rows")
+    commands = parser.add_subparsers(dest="command")
+
+    commands.add_parser("report", parents=[output, rows], help="list student records")
+
+    export = commands.add_parser("export", parents=[rows],
+                                 help="write records to a CSV/JSON Lines file or report cards to a folder")
+    export.add_argument("--format", choices=("csv", "jsonl") + tuple(CARD_FORMATS), default="csv",
+                        help="csv or jsonl for one file, html or text for one report card per student (default: csv)")
+    export.add_argument("--output", required=True, help="file (csv, jsonl) or folder (html, text) to write")
+    export.add_argument("--workers", type=int, default=EXPORT_WORKERS,
+                        help=f"processes rendering report cards (default: {EXPORT_WORKERS})")
+
+    summary = commands.add_parser("summary", parents=[output], help="percentage statistics for the cohort")
+    summary.add_argument("--by", choices=("grade",), help="one row per grade instead of one overall row")
+
+    cohorts = commands.add_parser("cohorts", parents=[output],
+                                  help=f"list the cohorts in {os.path.relpath(COHORTS_DIR, BASE_DIR)}/")
+    ranked = cohorts.add_mutually_exclusive_group()
+    ranked.add_argument("--top", type=_count_arg, metavar="N", help="the N highest-scoring students across all cohorts")
+    ranked.add_argument("--bottom", type=_count_arg, metavar="N", help="the N lowest-scoring students across all cohorts")
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        if tk is None:
+            parser.error("tkinter is not available; use the report, summary or cohorts command")
+        root = tk.Tk()
+        app = StudentManagerHybrid(root)
+        root.mainloop()
+        return 0
+
+    if args.command == "cohorts":
+        # Works from the cohort folder and its manifest whatever the backend
+        shards = ShardedStorage(read_only=True).shards
+        with redirect_stdout(sys.stderr):
+            shards.refresh()
+            rows = list(cohort_rows(shards, args.top, args.bottom))
+        ranked = args.top is not None or args.bottom is not None
+        fields = ("cohort",) + REPORT_FIELDS if ranked else COHORT_FIELDS
+        return write_output(args, rows, fields)
+
+    storage = open_storage(args.backend, read_only=True)  # Reports never rewrite the data files
+    try:
+        if args.cohort:
+            if not isinstance(storage, ShardedStorage):
+                parser.error("--cohort needs the cohorts backend (--backend cohorts)")
+            storage.cohort = args.cohort
+        with redirect_stdout(sys.stderr):  # Load warnings must not end up in the report
+            if args.command in ("report", "export"):
+                # The backend picks the rows, e.g. sqlite sorts and limits them in SQL
+                rows = storage.query_rows(args.sort, args.grade, args.min_percentage,
+                                          args.max_percentage, args.limit)
+                fields = REPORT_FIELDS
+            else:
+                rows, fields = summary_rows(storage.load(), args.by), SUMMARY_FIELDS
+        return write_output(args, rows, fields)  # Rows may still be streaming from the backend
+    finally:
+        storage.close()
+
+def write_output(args, rows, fields):
+    # Send a command's rows to stdout, or to the export file/folder
+    if args.command == "export":
+        if args.format in CARD_FORMATS:
+            result = export_report_cards(rows, args.output, args.format, max(1, args.workers))
+        else:
+            result = export_records(rows, args.output, args.format)
+        print(f"[ℹ️] {result}", file=sys.stderr)
+        return 0
+    try:
+        write_records(rows, args.format, fields)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader went away (e.g. piped into head); silence the flush at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    return 0
+
 # ---------------- RUN APPLICATION ----------------
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = StudentManagerHybrid(root)
-    root.mainloop()
+    sys.exit(main())
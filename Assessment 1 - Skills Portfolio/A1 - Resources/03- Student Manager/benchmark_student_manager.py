@@ -0,0 +1,215 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import Exercise3_StudentManager as sm
+
+# ---------------- SYNTHETIC DATA ----------------
+FIRST_NAMES = ["Jake", "John", "Jo", "Ron", "Sam", "Matt", "Les", "Lee", "Alan", "Gareth"]
+LAST_NAMES = ["Hobbs", "Curry", "Hyde", "Herrema", "Sturtivant", "Thompson", "Ferdinand", "Scott"]
+LOOKUPS = 10000  # Random code lookups timed per cohort
+WIDGET_OPS = ("view_all", "grid_update", "open_popup")  # Timings that need a Tk display
+
+def generate_marks_file(path, rows, seed=0):
+    # Write a studentMarks.txt style file with the given number of random students
+    # Codes are sequential from 1000 so large cohorts stay unique
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        f.write(f"{rows}\n")
+        for i in range(rows):
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            f.write(f"{1000 + i},{name},{rng.randint(0, 20)},{rng.randint(0, 20)},"
+                    f"{rng.randint(0, 20)},{rng.randint(0, 100)}\n")
+
+def use_data_dir(folder):
+    # Point the manager's data files at a scratch folder, on the text backend whatever
+    # STUDENT_STORAGE says, so nothing (e.g. a sqlite migration) reaches the real records
+    sm.STORAGE_BACKEND = "text"
+    sm.FILE_PATH = os.path.join(folder, "studentMarks.txt")
+    sm.SNAPSHOT_PATH = os.path.join(folder, "studentMarks.bin")
+    sm.DB_PATH = os.path.join(folder, "studentMarks.db")
+    sm.COHORTS_DIR = os.path.join(folder, "cohorts")
+    sm.IMPORT_REPORT_PATH = os.path.join(folder, "importReport.txt")
+    sm.LOCK_PATH = os.path.join(folder, "studentMarks.lock")  # Don't contend with a running manager
+    sm.JOURNAL_MODE = False
+
+def best_time(fn, repeat):
+    # Best wall-clock time of repeat runs, in seconds
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def peak_memory(fn):
+    # Peak bytes allocated by Python while fn runs (measured in a separate, slower run)
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+# ---------------- BENCHMARKS ----------------
+def build_widgets(students):
+    # Time the View All path: build the app in a withdrawn Tk root and lay out the grid.
+    # Returns (functions, None) with the functions to time (View All, an in-place edit of
+    # one row, opening the Add Student popup) and a cleanup function, or (None, reason)
+    # when Tk cannot run here.
+    if sm.tk is None:
+        return None, "tkinter is not installed"
+    try:
+        root = sm.tk.Tk()
+    except sm.tk.TclError:
+        return None, "no display for Tk"
+    root.withdraw()
+    try:
+        app = sm.StudentManagerHybrid(root)
+    except sm.tk.TclError as e:
+        root.destroy()
+        sm.clear_image_cache()
+        return None, f"Tk error building the app: {e}"
+    app.store_io.executor.shutdown(wait=True)  # Let the startup load finish, then use our store
+    app.students = students
+
+    def view_all():
+        for widget in app.bottom_frame.winfo_children():
+            widget.destroy()  # Time a fresh grid, not the reuse of the one already showing
+        app.view_all()
+        root.update_idletasks()
+
+    def edit_row():
+        students.update(0, students.row(0))
+        app.grid_changed("row_updated", 0)
+        root.update_idletasks()
+
+    def open_popup():
+        app.add_student()
+        root.update_idletasks()
+        app.hide_popup(app.popup("add"))
+
+    def cleanup():
+        root.destroy()
+        sm.clear_image_cache()
+    return (view_all, edit_row, open_popup, cleanup), None
+
+def bench_cohort(rows, repeat, widgets=True, skipped=None):
+    # Time and measure every data operation on one synthetic cohort; returns a list of results.
+    # Operations that could not be measured are added to skipped with the reason.
+    folder = tempfile.mkdtemp(prefix="student_bench_")
+    results = []
+
+    def measure(op, fn, per=1):
+        seconds = best_time(fn, repeat) / per
+        results.append({"rows": rows, "op": op, "seconds": seconds, "peak_bytes": peak_memory(fn)})
+
+    try:
+        use_data_dir(folder)
+        generate_marks_file(sm.FILE_PATH, rows)
+        students = sm.load_students_text()
+        sm.save_snapshot(students)
+
+        measure("load_text", sm.load_students_text)
+        measure("load_snapshot", sm.load_snapshot)
+        measure("save_text", lambda: sm.save_students(students, os.path.join(folder, "saved.txt")))
+        measure("save_snapshot", lambda: sm.save_snapshot(students, os.path.join(folder, "saved.bin")))
+
+        codes = random.Random(1).choices(range(1000, 1000 + rows), k=LOOKUPS)
+        measure("lookup", lambda: [students.row(students.find(code)) for code in codes], per=LOOKUPS)
+
+        # Sort Records view: percentage high to low, ties by name
+        measure("sort", lambda: students.sorted_order([("percentage", True), ("name", False)]))
+
+        def min_max_cold():
+            students._ranking = None  # Force the ranking to be rebuilt
+            return students.top(1), students.bottom(1)
+        measure("min_max_cold", min_max_cold)
+        measure("min_max", lambda: (students.top(1), students.bottom(1)))
+
+        widget_bench, reason = build_widgets(students) if widgets else (None, "--no-widgets")
+        if widget_bench is None:
+            if widgets:
+                print(f"[ℹ️] Skipped {', '.join(WIDGET_OPS)} at {rows} rows: {reason}", file=sys.stderr)
+            if skipped is not None:
+                skipped.extend({"rows": rows, "op": op, "reason": reason} for op in WIDGET_OPS)
+        if widget_bench is not None:
+            view_all, edit_row, open_popup, cleanup = widget_bench
+            try:
+                measure("view_all", view_all)
+                measure("grid_update", edit_row)
+                measure("open_popup", open_popup)
+            finally:
+                cleanup()
+        return results
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+# ---------------- REGRESSION CHECK ----------------
+def compare(results, baseline, tolerance):
+    # Results more than tolerance times slower than the baseline run, as (result, baseline seconds)
+    base = {(r["rows"], r["op"]): r["seconds"] for r in baseline["results"]}
+    slower = []
+    for r in results:
+        before = base.get((r["rows"], r["op"]))
+        if before and r["seconds"] > before * tolerance:
+            slower.append((r, before))
+    return slower
+
+def not_measured(results, baseline):
+    # Baseline operations this run has no result for, as (rows, op)
+    measured = {(r["rows"], r["op"]) for r in results}
+    return sorted({(r["rows"], r["op"]) for r in baseline["results"]} - measured)
+
+# ---------------- RUN BENCHMARKS ----------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Student Manager data benchmarks")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100000, 1000000],
+                        help="cohort sizes to generate")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement (best is kept)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON results of an earlier run to check against")
+    parser.add_argument("--tolerance", type=float, default=1.25,
+                        help="fail when an operation is this many times slower than the baseline")
+    parser.add_argument("--no-widgets", action="store_true", help="skip the View All widget benchmark")
+    args = parser.parse_args()
+
+    results = []
+    skipped = []  # {"rows", "op", "reason"} for operations that could not run here
+    print(f"{'rows':>10} {'operation':<14} {'time':>12} {'peak memory':>12}")
+    for rows in args.rows:
+        for r in bench_cohort(rows, args.repeat, widgets=not args.no_widgets, skipped=skipped):
+            results.append(r)
+            print(f"{r['rows']:>10} {r['op']:<14} {r['seconds'] * 1000:>10.3f}ms "
+                  f"{r['peak_bytes'] / 2 ** 20:>10.1f}MB")
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeat": args.repeat,
+        "results": results,
+        "skipped": skipped,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        slower = compare(results, baseline, args.tolerance)
+        for r, before in slower:
+            print(f"[⚠️] {r['op']} at {r['rows']} rows: {r['seconds'] * 1000:.3f}ms "
+                  f"(baseline {before * 1000:.3f}ms)")
+        reasons = {(s["rows"], s["op"]): s["reason"] for s in skipped}
+        for rows, op in not_measured(results, baseline):
+            why = reasons.get((rows, op), "not run")
+            print(f"[ℹ️] {op} at {rows} rows: not compared ({why})")
+        sys.exit(1 if slower else 0)
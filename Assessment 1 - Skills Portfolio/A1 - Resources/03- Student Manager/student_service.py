@@ -0,0 +1,399 @@
+import argparse
+import asyncio
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import Exercise3_StudentManager as sm
+
+# ---------------- SERVICE SETTINGS ----------------
+DEFAULT_HOST = "127.0.0.1"  # Loopback only: the service has no authentication
+DEFAULT_PORT = 8765
+STREAM_ROWS = 5000          # Records per chunk when streaming GET /students
+MAX_BODY = 64 * 1024 * 1024  # Largest request body accepted, in bytes
+FIELDS = ("code", "name", "c1", "c2", "c3", "exam")
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+class RequestError(Exception):
+    # An error reported to the client as an HTTP status with a JSON {"error": ...} body
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+# ---------------- STUDENT SERVICE ----------------
+class StudentService:
+    # Owns the student store for every client. Requests are handled on one asyncio loop,
+    # so each batch of changes is checked and applied without interleaving with another.
+    # Applied batches are written by one I/O thread in order; batches that arrive while a
+    # write is running share the next one (group commit), and a client only gets its reply
+    # once its batch is on disk.
+    #
+    # Every record has a version, starting at 1 and bumped on each update. A change that
+    # carries the version the client last saw is refused (409) if the record has moved on.
+    #
+    # Endpoints:
+    #   GET  /students          JSON Lines of [code, name, c1, c2, c3, exam, version]
+    #   GET  /students/<code>   one record as an object, with its version
+    #   POST /changes           {"changes": [{"op", "value", "version"?}, ...]}, all or nothing
+    #   GET  /stats             counters, e.g. for the load test
+    def __init__(self, storage):
+        self.storage = storage
+        self.students = storage.load()
+        self.versions = {}  # code -> version for records changed since startup (the rest are at 1)
+        self.io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="service-io")
+        self.unwritten = []   # (changes, future) applied to the store but not yet written
+        self.writer = None    # Task running write_pending()
+        self.counters = Counter()
+
+    def version(self, code):
+        return self.versions.get(code, 1)
+
+    # ---- HTTP ----
+    async def handle(self, reader, writer):
+        # Serve requests on one connection until the client closes it (keep-alive)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                    length = int(headers.get("content-length", 0))
+                    if length > MAX_BODY:
+                        keep_alive = False
+                        raise RequestError(413, "request body too large")
+                    body = await reader.readexactly(length) if length else b""
+                    await self.dispatch(method, target, body, writer, keep_alive)
+                except RequestError as e:
+                    self.counters["errors"] += 1
+                    await self.respond(writer, e.status, {"error": str(e)}, keep_alive)
+                except ValueError:
+                    self.counters["errors"] += 1
+                    await self.respond(writer, 400, {"error": "malformed request"}, False)
+                    break
+                except Exception as e:
+                    self.counters["errors"] += 1
+                    print(f"[⚠️] Request failed: {e!r}")
+                    await self.respond(writer, 500, {"error": str(e)}, False)
+                    break
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # Client went away mid-request
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, payload, keep_alive=True):
+        body = json.dumps(payload).encode()
+        writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                     f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body)
+        await writer.drain()
+
+    async def dispatch(self, method, target, body, writer, keep_alive):
+        path = urlsplit(target).path.rstrip("/")
+        self.counters["requests"] += 1
+        if path == "/students" and method == "GET":
+            await self.list_students(writer, keep_alive)
+        elif path.startswith("/students/") and method == "GET":
+            await self.respond(writer, 200, self.get_student(path[len("/students/"):]), keep_alive)
+        elif path == "/changes" and method == "POST":
+            try:
+                changes = json.loads(body)["changes"]
+            except (ValueError, KeyError, TypeError):
+                raise RequestError(400, 'expected a JSON body {"changes": [...]}')
+            await self.respond(writer, 200, await self.apply_changes(changes), keep_alive)
+        elif path == "/stats" and method == "GET":
+            await self.respond(writer, 200, dict(self.counters, students=len(self.students)), keep_alive)
+        elif path in ("/students", "/changes", "/stats") or path.startswith("/students/"):
+            raise RequestError(405, f"{method} not allowed on {path}")
+        else:
+            raise RequestError(404, f"no such endpoint {path}")
+
+    # ---- Reads ----
+    async def list_students(self, writer, keep_alive):
+        # Stream a consistent copy of every record as chunked JSON Lines
+        students, versions = self.students.copy(), dict(self.versions)
+        writer.write(f"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                     f"X-Student-Count: {len(students)}\r\nTransfer-Encoding: chunked\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode())
+        names = students.names
+        columns = (students.code, students.name_id, students.c1, students.c2, students.c3, students.exam)
+        for start in range(0, len(students), STREAM_ROWS):
+            chunk = "".join(
+                json.dumps([code, names[name_id], c1, c2, c3, exam, versions.get(code, 1)]) + "\n"
+                for code, name_id, c1, c2, c3, exam in zip(*(col[start:start + STREAM_ROWS] for col in columns))
+            ).encode()
+            writer.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+            await writer.drain()  # Lets other clients run between chunks
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    def get_student(self, code_text):
+        try:
+            code = int(code_text)
+        except ValueError:
+            raise RequestError(400, f"invalid student code {code_text!r}")
+        i = self.students.find(code)
+        if i < 0:
+            raise RequestError(404, f"student {code} not found")
+        return dict(self.students.row(i), version=self.version(code))
+
+    # ---- Writes ----
+    def check_changes(self, changes):
+        # Validate a batch against the current records without touching them.
+        # Returns [(op, value)] ready to apply, and the version each changed code ends up at.
+        after = {}  # code -> version after the earlier changes in this batch (None = deleted)
+
+        def current(code):
+            if code in after:
+                return after[code]
+            return self.version(code) if code in self.students else None
+
+        checked = []
+        for change in changes:
+            if not isinstance(change, dict):
+                raise RequestError(400, "each change must be an object")
+            op, value = change.get("op"), change.get("value")
+            if op == "delete":
+                code = value
+            elif op in ("add", "update"):
+                value = self.check_record(value)
+                code = value["code"]
+            else:
+                raise RequestError(400, f"unknown operation {op!r}")
+            if not isinstance(code, int):
+                raise RequestError(400, f"invalid student code {code!r}")
+            version = current(code)
+            if op == "add":
+                if version is not None:
+                    raise RequestError(409, f"student code {code} already exists")
+                after[code] = 1
+            else:
+                if version is None:
+                    raise RequestError(409, f"student {code} no longer exists")
+                if "version" in change and change["version"] != version:
+                    raise RequestError(409, f"student {code} was changed by someone else "
+                                            f"(version {change['version']}, now {version})")
+                after[code] = None if op == "delete" else version + 1
+            checked.append((op, value))
+        return checked, after
+
+    @staticmethod
+    def check_record(value):
+        # The record as a clean dict, or RequestError if a field is missing or invalid
+        if not isinstance(value, dict) or any(field not in value for field in FIELDS):
+            raise RequestError(400, f"a record needs the fields {', '.join(FIELDS)}")
+        record = {field: value[field] for field in FIELDS}
+        name = record["name"]
+        if not isinstance(name, str) or not name.strip() or "," in name:
+            raise RequestError(400, "name must be non-empty text without commas")
+        record["name"] = name.strip()
+        if not all(type(record[field]) is int for field in FIELDS if field != "name"):
+            raise RequestError(400, "code and marks must be integers")
+        if not 0 < record["code"] < 2 ** 31:
+            raise RequestError(400, f"student code {record['code']} out of range")
+        error = sm.marks_error(record["c1"], record["c2"], record["c3"], record["exam"])
+        if error:
+            raise RequestError(400, error)
+        return record
+
+    async def apply_changes(self, changes):
+        # Check the whole batch, apply it to the store, then wait for it to be written
+        checked, after = self.check_changes(changes)
+        for op, value in checked:
+            if op == "add":
+                self.students.append(value)
+            elif op == "update":
+                self.students.update(self.students.find(value["code"]), value)
+            else:
+                self.students.delete(self.students.find(value))
+            self.counters[op] += 1
+        for code, version in after.items():
+            if version is None:
+                self.versions.pop(code, None)
+            else:
+                self.versions[code] = version
+        if checked:
+            done = asyncio.get_running_loop().create_future()
+            self.unwritten.append((checked, done))
+            if self.writer is None or self.writer.done():
+                self.writer = asyncio.create_task(self.write_pending())
+            await done
+        return {"versions": list(after.items())}
+
+    async def write_pending(self):
+        # Write every applied batch, grouping whatever queued up during the previous write
+        loop = asyncio.get_running_loop()
+        while self.unwritten:
+            batches, self.unwritten = self.unwritten, []
+            changes = [change for checked, _ in batches for change in checked]
+            self.counters["writes"] += 1
+            try:
+                await loop.run_in_executor(self.io, self.storage.prepare_write(changes, self.students))
+            except Exception as e:
+                for _, done in batches:
+                    done.set_exception(e)
+            else:
+                for _, done in batches:
+                    done.set_result(None)
+
+    def close(self):
+        self.io.shutdown(wait=True)
+        self.storage.close()
+
+async def serve(service, host, port, ready=None):
+    # Run the service until cancelled; ready (a Future) receives the bound port
+    server = await asyncio.start_server(service.handle, host, port)
+    if ready is not None:
+        ready.set_result(server.sockets[0].getsockname()[1])
+    async with server:
+        await server.serve_forever()
+
+# ---------------- LOAD TEST ----------------
+async def http_request(reader, writer, method, path, payload=None):
+    # One keep-alive request from the load test client; returns (status, decoded JSON body)
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+                 f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+async def simulate_client(host, port, codes, requests, rng, latencies, outcomes):
+    # Read-modify-write loop over a shared set of records, as a busy staff member would
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(requests):
+            code = rng.choice(codes)
+            start = time.perf_counter()
+            status, record = await http_request(reader, writer, "GET", f"/students/{code}")
+            if status != 200:
+                outcomes[f"read {status}"] += 1
+                continue
+            version = record.pop("version")
+            record["exam"] = rng.randint(0, 100)
+            status, _ = await http_request(reader, writer, "POST", "/changes",
+                                           {"changes": [{"op": "update", "value": record, "version": version}]})
+            latencies.append(time.perf_counter() - start)
+            outcomes["saved" if status == 200 else "conflict" if status == 409 else f"write {status}"] += 1
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+async def load_test(host, port, clients, requests, hot_records, seed=0):
+    # Run clients concurrently and report throughput, latency and conflicts.
+    # The service's update count must match the saves the clients saw, or edits were lost.
+    status_reader, status_writer = await asyncio.open_connection(host, port)
+    _, before = await http_request(status_reader, status_writer, "GET", "/stats")
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(b"GET /students HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+    await writer.drain()
+    lines = (await reader.read()).split(b"\r\n\r\n", 1)[1].split(b"\r\n")
+    codes = [json.loads(row)[0] for chunk in lines[1::2] for row in chunk.splitlines() if row]
+    writer.close()
+    await writer.wait_closed()
+    rng = random.Random(seed)
+    hot = rng.sample(codes, min(hot_records, len(codes)))
+
+    latencies, outcomes = [], Counter()
+    start = time.perf_counter()
+    await asyncio.gather(*(simulate_client(host, port, hot, requests, random.Random(seed + i + 1),
+                                           latencies, outcomes) for i in range(clients)))
+    elapsed = time.perf_counter() - start
+    _, after = await http_request(status_reader, status_writer, "GET", "/stats")
+    status_writer.close()
+    await status_writer.wait_closed()
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))] * 1000 if latencies else 0.0
+    updates = after.get("update", 0) - before.get("update", 0)
+    return {"clients": clients, "requests": clients * requests, "seconds": elapsed,
+            "writes_per_s": len(latencies) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(50), "p95_ms": percentile(95), "p99_ms": percentile(99),
+            "outcomes": dict(outcomes), "server_updates": updates,
+            "disk_writes": after.get("writes", 0) - before.get("writes", 0),
+            "consistent": updates == outcomes["saved"]}
+
+async def run_load_test(args):
+    # Start a service on a synthetic cohort in a scratch folder (unless --url is given) and load test it
+    if args.url:
+        url = urlsplit(args.url)
+        return await load_test(url.hostname, url.port, args.clients, args.requests, args.hot)
+    from benchmark_student_manager import generate_marks_file, use_data_dir
+    folder = tempfile.mkdtemp(prefix="student_service_")
+    try:
+        use_data_dir(folder)
+        generate_marks_file(sm.FILE_PATH, args.rows)
+        service = StudentService(sm.open_storage("text"))
+        ready = asyncio.get_running_loop().create_future()
+        server = asyncio.create_task(serve(service, DEFAULT_HOST, 0, ready))
+        port = await ready
+        try:
+            return await load_test(DEFAULT_HOST, port, args.clients, args.requests, args.hot)
+        finally:
+            server.cancel()
+            await asyncio.gather(server, return_exceptions=True)
+            await asyncio.sleep(0)  # Let connection handlers see their clients hang up
+            service.close()
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+# ---------------- RUN SERVICE ----------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Shared student records service. Start the manager with STUDENT_STORAGE=service to use it.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_cmd = commands.add_parser("serve", help="serve studentMarks.txt (or the SQLite database) to clients")
+    serve_cmd.add_argument("--host", default=DEFAULT_HOST)
+    serve_cmd.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_cmd.add_argument("--backend", choices=("text", "sqlite"), default="text", help="where the records are kept")
+    test_cmd = commands.add_parser("loadtest", help="hammer a service with simulated clients")
+    test_cmd.add_argument("--url", help="service to test (default: start one on a synthetic cohort)")
+    test_cmd.add_argument("--rows", type=int, default=10000, help="size of the synthetic cohort")
+    test_cmd.add_argument("--clients", type=int, default=50, help="concurrent clients")
+    test_cmd.add_argument("--requests", type=int, default=200, help="read-modify-write cycles per client")
+    test_cmd.add_argument("--hot", type=int, default=100, help="records the clients compete for")
+    args = parser.parse_args()
+
+    if args.command == "loadtest":
+        print(json.dumps(asyncio.run(run_load_test(args)), indent=2))
+        sys.exit(0)
+
+    lock = sm.DataFileLock()
+    if not lock.acquire():
+        sys.exit("The student records are already open for editing in another Student Manager or service.")
+    service = StudentService(sm.open_storage(args.backend))
+    print(f"[ℹ️] Serving {len(service.students)} students on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+        lock.release()
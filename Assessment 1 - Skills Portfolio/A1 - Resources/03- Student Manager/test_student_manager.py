@@ -0,0 +1,434 @@
+import io
+import os
+import random
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from unittest import mock
+
+import Exercise3_StudentManager as sm
+
+
+class FakeRoot:
+    # Stands in for the Tk root: after() callbacks are queued and run by run_pending()
+    def __init__(self):
+        self.callbacks = {}
+        self.next_id = 0
+
+    def after(self, ms, fn, *args):
+        self.next_id += 1
+        self.callbacks[self.next_id] = (fn, args)
+        return self.next_id
+
+    def after_cancel(self, after_id):
+        self.callbacks.pop(after_id, None)
+
+    def run_pending(self, limit=1000):
+        for _ in range(limit):
+            if not self.callbacks:
+                return
+            after_id = min(self.callbacks)
+            fn, args = self.callbacks.pop(after_id)
+            fn(*args)
+            time.sleep(0.001)  # Give the I/O worker a moment between polls
+        raise AssertionError("after() callbacks never settled")
+
+
+class CohortStorageTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix="cohorts_test_")
+        for name, first_code in (("A", 1000), ("C", 2000)):
+            with open(os.path.join(self.folder, f"{name}.txt"), "w") as f:
+                f.write("2\n")
+                for code in (first_code, first_code + 1):
+                    f.write(f"{code},Student {code},10,10,10,50\n")
+        self.storage = sm.ShardedStorage(self.folder, "A")
+        self.root = FakeRoot()
+        self.io = sm.BackgroundStoreIO(self.root, self.storage)
+
+    def tearDown(self):
+        self.io.close()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def codes_on_disk(self, name):
+        students = sm.load_students_text(path=os.path.join(self.folder, f"{name}.txt"))
+        return sorted(students.code)
+
+    def open_cohort(self, name):
+        self.storage.cohort = name
+        return self.storage.load()
+
+    def add(self, students, code):
+        s = {"code": code, "name": f"Student {code}", "c1": 1, "c2": 2, "c3": 3, "exam": 4}
+        students.append(s)
+        self.io.record(students, "add", s)
+
+    def test_edits_to_two_cohorts_stay_in_their_own_files(self):
+        a = self.open_cohort("A")
+        self.add(a, 1002)
+        c = self.open_cohort("C")  # Switch before A's edit has been flushed
+        self.add(c, 2002)
+        self.root.run_pending()
+        self.assertEqual(self.codes_on_disk("A"), [1000, 1001, 1002])
+        self.assertEqual(self.codes_on_disk("C"), [2000, 2001, 2002])
+
+        # A is now served from the copy cached by its save; edits must still go to A
+        a = self.open_cohort("A")
+        self.add(a, 1003)
+        self.root.run_pending()
+        self.open_cohort("C")
+        self.root.run_pending()
+        self.assertEqual(self.codes_on_disk("A"), [1000, 1001, 1002, 1003])
+        self.assertEqual(self.codes_on_disk("C"), [2000, 2001, 2002])
+
+    def test_idle_cohorts_are_dropped_after_a_save(self):
+        self.storage.shards.idle_seconds = 0
+        self.open_cohort("A")
+        c = self.open_cohort("C")
+        self.add(c, 2002)
+        self.root.run_pending()
+        self.assertEqual(list(self.storage.shards.loaded), ["C"])
+
+    def test_top_of_no_students_is_empty(self):
+        self.storage.shards.refresh()
+        for n in (0, -1):
+            self.assertEqual(self.storage.shards.top(n), [])
+            self.assertEqual(self.storage.shards.top(n, lowest=True), [])
+        self.assertEqual(len(self.storage.shards.top(3)), 3)
+
+
+class JournalTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix="journal_test_")
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+        base = os.path.join(self.folder, "studentMarks.txt")
+        with open(base, "w") as f:
+            f.write("3\n1000,Jake Hobbs,10,10,10,50\n1001,Sam Hyde,20,20,20,90\n1002,Alan Scott,5,5,5,20\n")
+        past = time.time() - 60
+        os.utime(base, (past, past))  # So any journal written by a test is clearly newer
+        self.snapshot = os.path.join(self.folder, "studentMarks.bin")
+        self.journal = sm.StudentJournal(os.path.join(self.folder, "studentMarks.journal"), base,
+                                         compact_every=5, snapshot_path=self.snapshot)
+        patcher = mock.patch.multiple(sm, FILE_PATH=base, SNAPSHOT_PATH=self.snapshot, JOURNAL=self.journal,
+                                      JOURNAL_MODE=True, USE_SNAPSHOT=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.storage = sm.TextFileStorage()
+        self.students = self.reload()
+        self.rng = random.Random(4)
+        self.next_code = 2000
+
+    def reload(self):
+        with redirect_stdout(io.StringIO()):
+            return sm.load_students()
+
+    def assertReloads(self):
+        self.assertEqual(list(self.reload()), list(self.students))
+
+    def edit(self):
+        # Apply one random add/update/delete to self.students, returning it as a change
+        s, rng = self.students, self.rng
+        choice = rng.random() if s else 0
+        if choice < 0.4:
+            row = {"code": self.next_code, "name": f"Student {self.next_code}",
+                   "c1": rng.randint(0, 20), "c2": rng.randint(0, 20), "c3": rng.randint(0, 20),
+                   "exam": rng.randint(0, 100)}
+            self.next_code += 1
+            s.append(row)
+            return "add", row
+        i = rng.randrange(len(s))
+        if choice < 0.75:
+            row = dict(s.row(i), exam=rng.randint(0, 100), name=f"Renamed {rng.randint(0, 99)}")
+            s.update(i, row)
+            return "update", row
+        code = s.row(i)["code"]
+        s.delete(i)
+        return "delete", code
+
+    def test_random_edits_reload_to_the_same_records(self):
+        for step in range(60):
+            self.storage.write([self.edit() for _ in range(self.rng.randint(1, 3))], self.students)
+            if step % 7 == 0:
+                self.assertReloads()
+        self.assertReloads()
+
+    def test_torn_last_record_is_ignored(self):
+        self.storage.write([self.edit(), self.edit()], self.students)
+        with open(self.journal.path, "a") as f:
+            f.write("A,3000,Half Writ")  # A crash part-way through the last append
+        self.assertReloads()
+
+    def test_crash_between_rotate_and_write_base(self):
+        self.storage.write([self.edit(), self.edit()], self.students)
+        self.journal._rotate()  # The process dies before the base file is rewritten
+        self.storage.write([self.edit()], self.students)  # After a restart, edits go to a fresh journal
+        self.assertTrue(os.path.exists(self.journal.old_path))
+        self.assertReloads()
+        # The next compaction folds both files into the base file
+        for _ in range(self.journal.compact_every):
+            self.storage.write([self.edit()], self.students)
+        self.assertFalse(os.path.exists(self.journal.old_path))
+        self.assertReloads()
+
+    def test_crash_after_the_base_file_was_written(self):
+        self.storage.write([self.edit(), self.edit()], self.students)
+        self.journal._rotate()
+        sm.save_students(self.students.copy(), self.journal.base_path)
+        old = os.path.getmtime(self.journal.old_path) - 10
+        os.utime(self.journal.old_path, (old, old))  # Older than the base file that absorbed it
+        self.assertReloads()
+        self.assertFalse(os.path.exists(self.journal.old_path))
+
+    def test_edits_queued_behind_a_compaction_are_kept(self):
+        # Every write is prepared (on the Tk thread) before the worker runs any of them;
+        # the edits after the compacting write must land in the fresh journal
+        writes = [self.storage.prepare_write([self.edit()], self.students) for _ in range(self.journal.compact_every)]
+        writes.append(self.storage.prepare_write([self.edit(), self.edit()], self.students))
+        for write in writes:
+            write()
+        self.assertEqual(self.journal.records, 2)
+        self.assertReloads()
+
+    def test_compaction_keeps_the_snapshot_fresh(self):
+        with mock.patch.object(sm, "USE_SNAPSHOT", True):
+            for _ in range(self.journal.compact_every):
+                self.storage.write([self.edit()], self.students)
+            self.assertTrue(sm.snapshot_is_fresh(self.snapshot, self.journal.base_path))
+            self.assertEqual(list(sm.load_snapshot(self.snapshot)), list(self.students))
+            self.assertReloads()
+
+
+class SnapshotTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix="snapshot_test_")
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+        self.path = os.path.join(self.folder, "studentMarks.bin")
+        self.students = sm.StudentStore()
+        for i, name in enumerate(["Jake Hobbs", "Zoë Ängström", "Jake Hobbs", "李雷"]):
+            self.students.add_row(1000 + i, name, i, 20 - i, 10, 25 * i)
+        sm.save_snapshot(self.students, self.path)
+
+    def load(self):
+        with redirect_stdout(io.StringIO()):
+            return sm.load_snapshot(self.path)
+
+    def rewrite(self, body=None, recrc=True, **fields):
+        # Rewrite the snapshot with some header fields (and optionally the body) replaced
+        with open(self.path, "rb") as f:
+            data = f.read()
+        size = sm.SNAPSHOT_HEADER.size
+        header = dict(zip(("magic", "version", "big_endian", "count", "names", "crc"),
+                          sm.SNAPSHOT_HEADER.unpack_from(data)))
+        header.update(fields)
+        body = data[size:] if body is None else body
+        if recrc:
+            header["crc"] = sm.zlib.crc32(body)
+        with open(self.path, "wb") as f:
+            f.write(sm.SNAPSHOT_HEADER.pack(*header.values()) + body)
+
+    def test_round_trip(self):
+        loaded = self.load()
+        self.assertEqual(list(loaded), list(self.students))
+        self.assertEqual(loaded.names, self.students.names)
+        sm.save_snapshot(sm.StudentStore(), self.path)
+        self.assertEqual(len(self.load()), 0)
+
+    def test_checksum_mismatch_is_ignored(self):
+        with open(self.path, "r+b") as f:
+            f.seek(sm.SNAPSHOT_HEADER.size + 2)
+            byte = f.read(1)
+            f.seek(-1, os.SEEK_CUR)
+            f.write(bytes([byte[0] ^ 0xFF]))
+        self.assertIsNone(self.load())
+
+    def test_truncated_file_is_ignored(self):
+        with open(self.path, "rb") as f:
+            data = f.read()
+        for size in (len(data) - 5, sm.SNAPSHOT_HEADER.size - 1, 0):
+            with open(self.path, "wb") as f:
+                f.write(data[:size])
+            self.assertIsNone(self.load())
+        # A valid checksum over a body too short for the columns the header promises
+        with open(self.path, "wb") as f:
+            f.write(data)
+        self.rewrite(count=len(self.students) + 100)
+        self.assertIsNone(self.load())
+
+    def test_name_count_mismatch_is_ignored(self):
+        self.rewrite(names=len(self.students.names) + 1)
+        self.assertIsNone(self.load())
+
+    def test_other_byte_order_is_swapped(self):
+        # Write the columns as a machine of the other byte order would, then load them
+        columns = []
+        for attr in sm.StudentStore.COLUMNS:
+            col = getattr(self.students, attr)[:]
+            col.byteswap()
+            columns.append(col.tobytes())
+        names = "\n".join(self.students.names).encode("utf-8")
+        self.rewrite(body=b"".join(columns) + names, big_endian=sys.byteorder != "big")
+        self.assertEqual(list(self.load()), list(self.students))
+
+    def test_freshness_follows_the_text_file(self):
+        text = os.path.join(self.folder, "studentMarks.txt")
+        self.assertFalse(sm.snapshot_is_fresh(self.path, text))  # No text file
+        sm.save_students(self.students, text)
+        past = time.time() - 60
+        os.utime(self.path, (past, past))
+        self.assertFalse(sm.snapshot_is_fresh(self.path, text))  # Older than the text file
+        sm.save_snapshot(self.students, self.path)
+        self.assertTrue(sm.snapshot_is_fresh(self.path, text))
+        os.remove(self.path)
+        self.assertFalse(sm.snapshot_is_fresh(self.path, text))
+
+
+class StudentSearchTests(unittest.TestCase):
+    def setUp(self):
+        self.students = sm.StudentStore()
+        for i, name in enumerate(["Jake Hobbs", "John Curry", "Sam Hyde", "Alan Scott"]):
+            self.students.add_row(1000 + i, name, 10, 10, 10, 50)
+
+    def names_found(self, query):
+        return sorted(self.students.row(i)["name"] for i in self.students.search(query, 100))
+
+    def test_edits_are_searchable_without_rebuilding_the_index(self):
+        self.assertEqual(self.names_found("h"), ["Jake Hobbs", "John Curry", "Sam Hyde"])
+        tables = self.students._search.tables
+        self.students.update(1, dict(self.students.row(1), name="Jon Hobbs"))
+        self.students.delete(0)  # Alan Scott moves into row 0
+        self.students.append({"code": 2000, "name": "Les Ferdinand", "c1": 1, "c2": 2, "c3": 3, "exam": 4})
+        self.assertEqual(self.names_found("hobbs"), ["Jon Hobbs"])
+        self.assertEqual(self.names_found("curry"), [])
+        self.assertEqual(self.names_found("scott"), ["Alan Scott"])
+        self.assertEqual(self.names_found("dina"), ["Les Ferdinand"])
+        self.assertEqual(self.names_found("200"), ["Les Ferdinand"])
+        self.assertIs(self.students._search.tables, tables)
+
+
+class MetricCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.students = sm.StudentStore()
+        for i in range(100):
+            self.students.add_row(1000 + i, f"Student {i}", i % 21, 10, 10, i)
+        self.students.percentages()  # Build the cache
+        self.keys = [("percentage", True)]
+
+    def render(self):
+        # The metric reads a grid refresh and a sort-view placement make
+        s = self.students
+        s.totals(), s.percentages(), s.grades()
+        for i in range(12):
+            s.metrics(i)
+        order = list(s.sorted_order(self.keys))
+        order.remove(5)
+        s.insert_position(order, 5, self.keys)
+
+    def misses_after(self, change):
+        before = self.students.metric_stats()["misses"]
+        change()
+        return self.students.metric_stats()["misses"] - before
+
+    def test_one_miss_per_edit_and_none_per_render(self):
+        s = self.students
+        hits = s.metric_stats()["hits"]
+        self.assertEqual(self.misses_after(self.render), 0)
+        self.assertLess(s.metric_stats()["hits"] - hits, 50)  # Counted per read, not per row
+        self.assertEqual(self.misses_after(lambda: s.update(3, dict(s.row(3), exam=99))), 1)
+        self.assertEqual(self.misses_after(lambda: s.append(dict(s.row(0), code=5000))), 1)
+        self.assertEqual(self.misses_after(lambda: s.delete(0)), 0)
+
+    def test_counters_are_in_the_metrics_dump(self):
+        metrics = sm.OperationMetrics(enabled=True)
+        with mock.patch.object(sm, "METRICS", metrics):
+            self.render()
+            self.students.update(3, dict(self.students.row(3), exam=99))
+        text = metrics.prometheus()
+        self.assertIn('student_manager_events_total{event="metric_cache_misses"} 1\n', text)
+        self.assertIn('student_manager_events_total{event="metric_cache_hits"}', text)
+
+
+class ImportTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix="import_test_")
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+        rows = [f"{2000 + i},Student {i},{i % 21},10,10,{i}" for i in range(40)]
+        rows[10] = "2010,Student 10,25,10,10,50"          # Line 12: c1 out of range
+        rows[20] = '2020,"Smith, John",10,10,10,50'        # Line 22: comma in the name
+        rows[21] = '2021,"Ann Lee",10,10,10,50'            # Quoted, but a valid name
+        rows[30] = "2005,Again,1,1,1,1"                   # Line 32: code already on line 7
+        rows[35] = "not,a,row"                            # Line 37: wrong field count
+        self.csv = self.write("a.csv", "\ufeffcode,name,c1,c2,c3,exam\r\n" + "\r\n".join(rows) + "\r\n")
+        self.txt = self.write("b.txt", "3\n3000,Ed Ball,1,2,3,4\n2001,Copy,1,1,1,1\n4000,Old,1,1,1,1\n")
+        self.empty = self.write("c.csv", "")
+
+    def write(self, name, text):
+        path = os.path.join(self.folder, name)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        return path
+
+    def run_import(self, paths, **kwargs):
+        result = sm.import_csv_files(paths, existing={4000}, **kwargs)
+        return result.files, list(result.rows), result.rows.names, result.rejected
+
+    def test_rows_lines_and_duplicates(self):
+        files, rows, names, rejected = self.run_import([self.csv, self.txt, self.empty, self.csv], workers=1)
+        self.assertEqual(files, [self.csv, self.txt, self.empty])
+        self.assertEqual([(f, n) for f, n, _, _ in rejected],
+                         [(self.csv, 12), (self.csv, 22), (self.csv, 32), (self.csv, 37), (self.txt, 3), (self.txt, 4)])
+        self.assertEqual([reason for *_, reason in rejected],
+                         ["c1 must be between 0 and 20, got 25", "name contains a comma", "duplicate student code 2005",
+                          "expected 6 fields, found 3", "duplicate student code 2001", "duplicate student code 4000"])
+        self.assertEqual(rejected[1][2], '2020,"Smith, John",10,10,10,50')  # CRLF stripped
+        self.assertEqual(len(rows), 37)
+        self.assertEqual(rows[0]["code"], 2000)
+        self.assertIn("Ann Lee", names)
+        self.assertEqual(rows[-1]["name"], "Ed Ball")
+
+    def test_chunking_and_workers_give_the_same_result(self):
+        paths = [self.csv, self.txt, self.empty]
+        expected = self.run_import(paths, workers=1)
+        for chunk_bytes in (1, 7, 100, 1 << 20):
+            for workers in (1, 3):
+                with self.subTest(chunk_bytes=chunk_bytes, workers=workers):
+                    self.assertEqual(self.run_import(paths, workers=workers, chunk_bytes=chunk_bytes), expected)
+
+    def test_empty_file_is_counted(self):
+        result = sm.import_csv_files([self.empty], workers=1)
+        report = os.path.join(self.folder, "report.txt")
+        result.write_report(report)
+        with open(report) as f:
+            self.assertEqual(f.readline(), "Imported 0 student(s) from 1 file(s), rejected 0 row(s)\n")
+
+
+class ReportCommandTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix="report_test_")
+        path = lambda name: os.path.join(self.folder, name)
+        with open(path("studentMarks.txt"), "w") as f:
+            f.write("3\n1000,Jake Hobbs,10,10,10,50\n1001,Sam Hyde,20,20,20,90\n1002,Alan Scott,5,5,5,20\n")
+        patcher = mock.patch.multiple(sm, FILE_PATH=path("studentMarks.txt"), SNAPSHOT_PATH=path("studentMarks.bin"),
+                                      DB_PATH=path("studentMarks.db"), JOURNAL_MODE=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+
+    def report(self, *argv):
+        out = io.StringIO()
+        with redirect_stdout(out), redirect_stderr(io.StringIO()):
+            self.assertEqual(sm.main(list(argv)), 0)
+        return out.getvalue().splitlines()
+
+    def test_reports_leave_the_data_files_alone(self):
+        for backend in ("text", "sqlite"):
+            rows = self.report("--backend", backend, "report", "--sort", "percentage:desc", "--limit", "2")
+            self.assertEqual([row.split(",")[0] for row in rows], ["code", "1001", "1000"])
+        self.assertEqual(os.listdir(self.folder), ["studentMarks.txt"])
+
+
+if __name__ == "__main__":
+    unittest.main()